@@ -5,12 +5,29 @@ Handles persistent storage of scheduled bookings in JSON file
 
 import json
 import os
+import re
 import fcntl
+import mmap
+import atexit
 import logging
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional
 from contextlib import contextmanager
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+# Stdlib encoders reused across writes when orjson is not installed
+_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+_LINE_ENCODER = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
 logger = logging.getLogger(__name__)
 
 # Get data directory from environment variable or use current directory
@@ -28,6 +45,25 @@ if not os.path.exists(DATA_DIR):
 
 BOOKINGS_FILE = os.path.join(DATA_DIR, "scheduled_bookings.json")
 BACKUP_FILE = os.path.join(DATA_DIR, "scheduled_bookings.backup.json")
+LOGS_DIR = os.path.join(DATA_DIR, "logs")
+
+# Booking ids name files in LOGS_DIR, so they are limited to a safe character set
+BOOKING_ID_RE = re.compile(r'[A-Za-z0-9_-]+')
+
+# Booking log entries are appended to logs/<id>.jsonl; only the most recent ones are returned with a booking
+MAX_INLINE_LOGS = 500
+
+# Batched status updates are kept in memory and written together
+LOG_FLUSH_INTERVAL = 0.25  # seconds
+LOG_FLUSH_MAX_PENDING = 50  # flush immediately once this many changes are queued
+
+# Only take cross-process fcntl locks when several processes share the bookings file
+MULTI_PROCESS = os.getenv("MULTI_PROCESS", "false").lower() == "true"
+
+# Number of rolling backups (scheduled_bookings.backup.json.1 .. N) kept in the background, 0 disables
+BACKUP_ROTATIONS = int(os.getenv("BOOKINGS_BACKUP_ROTATIONS", "3"))
+# Minimum seconds between rolling backups, so each generation is a meaningfully older snapshot
+BACKUP_ROTATION_INTERVAL = float(os.getenv("BOOKINGS_BACKUP_INTERVAL", "300"))
 
 # Warn if using /tmp (data will be lost on restart)
 if DATA_DIR == "/tmp":
@@ -35,75 +71,232 @@ if DATA_DIR == "/tmp":
     logger.warning("⚠️ For persistent storage, upgrade to a paid Render plan with disk storage")
 
 
+def _dumps(data: Dict) -> bytes:
+    """Serialize bookings data to indented JSON bytes
+
+    orjson builds the whole document in one contiguous bytes buffer, which is
+    written to disk with a single write call.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return _ENCODER.encode(data).encode()
+
+
+def _dumps_line(entry: Dict) -> bytes:
+    """Serialize a single entry as one compact JSON line"""
+    if orjson is not None:
+        return orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE)
+    return _LINE_ENCODER.encode(entry).encode() + b"\n"
+
+
+def _loads(raw) -> Dict:
+    """Parse bookings data from JSON bytes (or any buffer, e.g. a memoryview)"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(bytes(raw))
+
+
 class BookingStorage:
     """Manages persistent storage of scheduled bookings"""
     
     def __init__(self, bookings_file: str = BOOKINGS_FILE):
         self.bookings_file = bookings_file
         self.backup_file = BACKUP_FILE
+        self.lock_file = self.bookings_file + ".lock"
+        self._cache: Optional[Dict] = None  # Parsed bookings file, reused between operations
+        self._cache_mtime: Optional[int] = None  # mtime (ns) of the file the cache was loaded from
+        self._index: Dict[str, Dict] = {}  # Booking ID -> booking dict inside the cache
+        self._url_index: Dict[str, Dict] = {}  # URL -> most recently saved booking for it
+        self._events: Dict[str, deque] = {}  # Booking ID -> recent entries of its append-only log
+        self._lock = threading.RLock()
+        self._flock_depth = 0  # Nesting depth of _file_lock; flock isn't reentrant across file handles
+        self._dirty = False  # Cache holds batched changes not yet written to disk
+        self._pending_changes = 0
+        self._flush_timer: Optional[threading.Timer] = None
+        self._backup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bookings-backup")
+        self._last_rotation: Optional[float] = None  # monotonic time of the last rolling backup
         self._ensure_file_exists()
+        atexit.register(self.flush)
     
     def _ensure_file_exists(self):
         """Create bookings file if it doesn't exist"""
-        if not os.path.exists(self.bookings_file):
-            self._write_bookings({"bookings": []})
-            logger.info(f"📁 Created new bookings file: {self.bookings_file}")
+        # Checked under the lock so a process starting up can't blank a file another one just created
+        with self._locked():
+            if not os.path.exists(self.bookings_file):
+                self._write_bookings({"bookings": []})
+                logger.info(f"📁 Created new bookings file: {self.bookings_file}")
     
     @contextmanager
-    def _file_lock(self, file_handle, lock_type=fcntl.LOCK_EX):
-        """Context manager for file locking"""
-        try:
-            fcntl.flock(file_handle, lock_type)
-            yield file_handle
-        finally:
-            fcntl.flock(file_handle, fcntl.LOCK_UN)
+    def _file_lock(self, lock_type=fcntl.LOCK_EX):
+        """Cross-process file lock, a no-op unless MULTI_PROCESS is enabled
+
+        Within one process all access is serialized by self._lock already. Nested
+        calls reuse the outermost lock, so a read-modify-write holds it throughout.
+        """
+        if not MULTI_PROCESS:
+            yield
+            return
+
+        with self._lock:
+            if self._flock_depth:
+                self._flock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth -= 1
+                return
+
+            with open(self.lock_file, 'a') as lock_handle:
+                fcntl.flock(lock_handle, lock_type)
+                self._flock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth = 0
+                    fcntl.flock(lock_handle, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the thread lock, and with MULTI_PROCESS the file lock, across a whole read-modify-write"""
+        with self._lock, self._file_lock():
+            yield
     
     def _read_bookings(self) -> Dict:
-        """Read bookings from JSON file with file locking"""
+        """Read bookings from the in-memory cache, reloading the JSON file only if it changed on disk"""
         try:
-            with open(self.bookings_file, 'r') as f:
-                with self._file_lock(f, fcntl.LOCK_SH):
-                    data = json.load(f)
-                    return data
+            if self._dirty:
+                # Unflushed log entries only exist in the cache, don't reload over them
+                return self._cache
+
+            st = os.stat(self.bookings_file)
+            if self._cache is None or st.st_mtime_ns != self._cache_mtime:
+                with self._file_lock(fcntl.LOCK_SH):
+                    with open(self.bookings_file, 'rb') as f:
+                        self._cache = self._load_file(f)
+                self._cache_mtime = st.st_mtime_ns
+                self._rebuild_index()
+                logger.debug(f"📂 Loaded bookings from {self.bookings_file}")
+            return self._cache
         except json.JSONDecodeError as e:
             logger.error(f"❌ Corrupted JSON in bookings file: {e}")
             return self._recover_from_backup()
         except FileNotFoundError:
             logger.warning("⚠️  Bookings file not found, creating new one")
             self._ensure_file_exists()
-            return {"bookings": []}
+            return self._cache
         except Exception as e:
             logger.error(f"❌ Error reading bookings file: {e}")
+            self._cache = None
+            self._index = {}
+            self._url_index = {}
             return {"bookings": []}
+
+    def _load_file(self, f) -> Dict:
+        """Parse an open bookings file straight from the page cache via mmap"""
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            # Nothing to map; let the parser raise so corruption handling kicks in
+            return _loads(b"")
+
+        mm = mmap.mmap(f.fileno(), size, prot=mmap.PROT_READ)
+        try:
+            with memoryview(mm) as view:
+                return _loads(view)
+        finally:
+            mm.close()
+
+    def _rebuild_index(self):
+        """Rebuild the booking ID and URL indexes from the cached bookings"""
+        bookings = self._cache.get("bookings", [])
+        self._index = {b.get("id"): b for b in bookings}
+        # Later bookings overwrite earlier ones, so each URL maps to its newest booking
+        self._url_index = {b.get("url"): b for b in bookings}
     
-    def _write_bookings(self, data: Dict):
-        """Write bookings to JSON file with file locking and backup"""
+    def _write_bookings(self, data: Dict, skip_backup: bool = False):
+        """Write bookings to JSON file atomically, keeping the previous version as backup
+
+        skip_backup leaves the backup file untouched (used when restoring from it).
+        """
+        tmp_file = self.bookings_file + ".tmp"
         try:
-            # Create backup before writing
-            if os.path.exists(self.bookings_file):
-                with open(self.bookings_file, 'r') as src:
-                    with open(self.backup_file, 'w') as dst:
-                        dst.write(src.read())
-            
-            # Write new data
-            with open(self.bookings_file, 'w') as f:
-                with self._file_lock(f):
-                    json.dump(data, f, indent=2)
+            # Serialize up front so the lock only covers the actual file I/O
+            buf = _dumps(data)
+
+            with self._lock, self._file_lock():
+                # Write new data to a temp file first so a crash never leaves a half-written file
+                with open(tmp_file, 'wb') as f:
+                    f.write(buf)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                # Current file becomes the backup, temp file takes its place
+                if not skip_backup and os.path.exists(self.bookings_file):
+                    self._link_backup()
+                os.replace(tmp_file, self.bookings_file)
+
+                # Keep the cache in sync with what is now on disk; mutators keep the
+                # index up to date themselves, so it only needs rebuilding for new data
+                if data is not self._cache:
+                    self._cache = data
+                    self._rebuild_index()
+                self._cache_mtime = os.stat(self.bookings_file).st_mtime_ns
+                self._dirty = False
+                self._pending_changes = 0
             
             logger.debug(f"✅ Bookings saved to {self.bookings_file}")
+
+            # Rolling backups happen off the caller's thread, at most once per interval
+            if BACKUP_ROTATIONS > 0 and not skip_backup:
+                now = time.monotonic()
+                if self._last_rotation is None or now - self._last_rotation >= BACKUP_ROTATION_INTERVAL:
+                    self._last_rotation = now
+                    self._backup_executor.submit(self._rotate_backups)
         except Exception as e:
             logger.error(f"❌ Error writing bookings file: {e}")
+            # The cache may hold changes that never reached disk; force a reload
+            self._cache = None
+            self._index = {}
+            self._url_index = {}
+            self._dirty = False
+            self._pending_changes = 0
             raise
     
+    def _link_backup(self):
+        """Point the backup file at the current bookings file without copying its bytes"""
+        try:
+            os.unlink(self.backup_file)
+        except FileNotFoundError:
+            pass
+
+        try:
+            # Hardlink keeps the bookings path in place until the new file is renamed over it
+            os.link(self.bookings_file, self.backup_file)
+        except OSError:
+            # Filesystem without hardlink support
+            os.replace(self.bookings_file, self.backup_file)
+    
+    def _rotate_backups(self):
+        """Shift backup.1 .. backup.N-1 up by one and snapshot the current file as backup.1"""
+        try:
+            for i in range(BACKUP_ROTATIONS - 1, 0, -1):
+                older = f"{self.backup_file}.{i}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.backup_file}.{i + 1}")
+
+            # A real copy, so later edits to the live file never reach the snapshot
+            shutil.copy2(self.bookings_file, f"{self.backup_file}.1")
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to rotate bookings backups: {e}")
+    
     def _recover_from_backup(self) -> Dict:
         """Recover bookings from backup file"""
         try:
             if os.path.exists(self.backup_file):
                 logger.info("🔄 Attempting to recover from backup file")
-                with open(self.backup_file, 'r') as f:
-                    data = json.load(f)
-                # Restore from backup
-                self._write_bookings(data)
+                with open(self.backup_file, 'rb') as f:
+                    data = self._load_file(f)
+                # Restore from backup without replacing the backup with the corrupted file
+                self._write_bookings(data, skip_backup=True)
                 logger.info("✅ Successfully recovered from backup")
                 return data
         except Exception as e:
@@ -114,148 +307,256 @@ class BookingStorage:
     
     def get_all_bookings(self) -> List[Dict]:
         """Get all bookings"""
-        data = self._read_bookings()
-        return data.get("bookings", [])
+        with self._lock:
+            data = self._read_bookings()
+            return [self._with_logs(b) for b in data.get("bookings", [])]
     
     def get_booking(self, booking_id: str) -> Optional[Dict]:
         """Get a specific booking by ID"""
-        bookings = self.get_all_bookings()
-        for booking in bookings:
-            if booking.get("id") == booking_id:
-                return booking
-        return None
+        with self._lock:
+            self._read_bookings()
+            booking = self._index.get(booking_id)
+            return self._with_logs(booking) if booking is not None else None
+
+    def _with_logs(self, booking: Dict) -> Dict:
+        """Return a copy of the booking with its appended log entries merged into "logs"
+
+        Callers get a shallow copy, so changing it never reaches the cache.
+        """
+        events = self._event_tail(booking.get("id"))
+        return {**booking, "logs": booking.get("logs", []) + list(events)}
+
+    def _events_path(self, booking_id: str) -> str:
+        """Path of a booking's append-only JSONL log"""
+        if not isinstance(booking_id, str) or not BOOKING_ID_RE.fullmatch(booking_id):
+            raise ValueError(f"Invalid booking id: {booking_id!r}")
+        return os.path.join(LOGS_DIR, f"{booking_id}.jsonl")
+
+    def _event_tail(self, booking_id: str) -> deque:
+        """Recent log entries for a booking, read from its JSONL log on first use"""
+        events = self._events.get(booking_id)
+        # Other processes may append to the log too, so shared logs are re-read every time
+        if events is None or MULTI_PROCESS:
+            events = deque(maxlen=MAX_INLINE_LOGS)
+            try:
+                with open(self._events_path(booking_id), 'rb') as f:
+                    for line in f:
+                        if line.strip():
+                            events.append(_loads(line))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"❌ Failed to read log file for booking {booking_id}: {e}")
+            self._events[booking_id] = events
+        return events
     
+    def find_booking_by_url(self, url: str) -> Optional[Dict]:
+        """Get the most recently saved booking for a URL"""
+        with self._lock:
+            self._read_bookings()
+            booking = self._url_index.get(url)
+            return dict(booking) if booking is not None else None
+
     def save_booking(self, booking: Dict) -> bool:
         """Save a new booking"""
-        try:
-            data = self._read_bookings()
-            bookings = data.get("bookings", [])
+        with self._locked():
+            try:
+                data = self._read_bookings()
+                bookings = data.setdefault("bookings", [])
+
+                booking_id = booking.get('id')
+                if not isinstance(booking_id, str) or not BOOKING_ID_RE.fullmatch(booking_id):
+                    logger.warning(f"⚠️  Rejected booking with invalid id {booking_id!r}")
+                    return False
+
+                # Check for duplicate ID
+                if booking_id in self._index:
+                    logger.warning(f"⚠️  Booking {booking_id} already exists, skipping duplicate save")
+                    return False
+
+                # Add timestamps
+                now = datetime.now().isoformat()
+                booking["created_at"] = now
+                booking["updated_at"] = now
+
+                # Initialize logs if not present
+                if "logs" not in booking:
+                    booking["logs"] = []
+
+                bookings.append(booking)
+                self._index[booking_id] = booking
+                self._url_index[booking.get("url")] = booking
 
-            # Check for duplicate ID
-            booking_id = booking.get('id')
-            if any(b.get('id') == booking_id for b in bookings):
-                logger.warning(f"⚠️  Booking {booking_id} already exists, skipping duplicate save")
+                self._write_bookings(data)
+                logger.info(f"✅ Saved booking {booking.get('id')}")
+                return True
+            except Exception as e:
+                logger.error(f"❌ Failed to save booking: {e}")
                 return False
 
-            # Add timestamps
-            now = datetime.now().isoformat()
-            booking["created_at"] = now
-            booking["updated_at"] = now
-
-            # Initialize logs if not present
-            if "logs" not in booking:
-                booking["logs"] = []
-
-            bookings.append(booking)
-            data["bookings"] = bookings
-
-            self._write_bookings(data)
-            logger.info(f"✅ Saved booking {booking.get('id')}")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to save booking: {e}")
-            return False
-
-    def update_booking(self, booking_id: str, updates: Dict) -> bool:
-        """Update an existing booking"""
-        try:
-            data = self._read_bookings()
-            bookings = data.get("bookings", [])
-
-            # Find and update the booking
-            found = False
-            for i, booking in enumerate(bookings):
-                if booking.get("id") == booking_id:
-                    # Update fields
-                    for key, value in updates.items():
-                        booking[key] = value
-
-                    # Update timestamp
-                    booking["updated_at"] = datetime.now().isoformat()
-
-                    bookings[i] = booking
-                    found = True
-                    break
-
-            if not found:
-                logger.warning(f"⚠️  Booking {booking_id} not found for update")
+    def update_booking(self, booking_id: str, updates: Dict, batched: bool = False) -> bool:
+        """Update an existing booking
+
+        With batched=True the change is written by the background flush
+        together with other pending changes instead of immediately.
+        """
+        with self._locked():
+            try:
+                data = self._read_bookings()
+
+                booking = self._index.get(booking_id)
+                if booking is None:
+                    logger.warning(f"⚠️  Booking {booking_id} not found for update")
+                    return False
+
+                # The id keys the index and the booking's log file, so it can't be changed
+                if updates.get("id", booking_id) != booking_id:
+                    logger.warning(f"⚠️  Refusing to change id of booking {booking_id}")
+                    return False
+
+                # Update fields
+                for key, value in updates.items():
+                    booking[key] = value
+                if "url" in updates:
+                    self._rebuild_index()
+
+                # Update timestamp
+                booking["updated_at"] = datetime.now().isoformat()
+
+                if batched:
+                    self._schedule_flush()
+                else:
+                    self._write_bookings(data)
+                logger.info(f"✅ Updated booking {booking_id}")
+                return True
+            except Exception as e:
+                logger.error(f"❌ Failed to update booking: {e}")
                 return False
 
-            data["bookings"] = bookings
-            self._write_bookings(data)
-            logger.info(f"✅ Updated booking {booking_id}")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to update booking: {e}")
-            return False
-
     def delete_booking(self, booking_id: str) -> bool:
         """Delete a booking"""
-        try:
-            data = self._read_bookings()
-            bookings = data.get("bookings", [])
-
-            # Filter out the booking to delete
-            original_count = len(bookings)
-            bookings = [b for b in bookings if b.get("id") != booking_id]
-
-            if len(bookings) == original_count:
-                logger.warning(f"⚠️  Booking {booking_id} not found for deletion")
+        with self._locked():
+            try:
+                data = self._read_bookings()
+
+                booking = self._index.get(booking_id)
+                if booking is None:
+                    logger.warning(f"⚠️  Booking {booking_id} not found for deletion")
+                    return False
+
+                # Filter out the booking to delete
+                data["bookings"] = [b for b in data.get("bookings", []) if b is not booking]
+                del self._index[booking_id]
+                if self._url_index.get(booking.get("url")) is booking:
+                    # Fall back to the next newest booking for the URL, if any
+                    self._rebuild_index()
+                self._write_bookings(data)
+                self._remove_events(booking_id)
+                logger.info(f"✅ Deleted booking {booking_id}")
+                return True
+            except Exception as e:
+                logger.error(f"❌ Failed to delete booking: {e}")
                 return False
 
-            data["bookings"] = bookings
-            self._write_bookings(data)
-            logger.info(f"✅ Deleted booking {booking_id}")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to delete booking: {e}")
-            return False
-
     def add_log_to_booking(self, booking_id: str, log_entry: Dict) -> bool:
         """Add a log entry to a booking"""
-        try:
-            data = self._read_bookings()
-            bookings = data.get("bookings", [])
-
-            # Find the booking and add log
-            found = False
-            for i, booking in enumerate(bookings):
-                if booking.get("id") == booking_id:
-                    if "logs" not in booking:
-                        booking["logs"] = []
-
-                    # Add timestamp if not present
-                    if "timestamp" not in log_entry:
-                        log_entry["timestamp"] = datetime.now().isoformat()
-
-                    booking["logs"].append(log_entry)
-                    booking["updated_at"] = datetime.now().isoformat()
-
-                    bookings[i] = booking
-                    found = True
-                    break
+        with self._locked():
+            try:
+                self._read_bookings()
+
+                booking = self._index.get(booking_id)
+                if booking is None:
+                    logger.warning(f"⚠️  Booking {booking_id} not found for log addition")
+                    return False
+
+                # Add timestamp if not present
+                now = datetime.now().isoformat()
+                if "timestamp" not in log_entry:
+                    log_entry["timestamp"] = now
+
+                if not self.append_event(booking_id, log_entry):
+                    return False
+
+                # Written by the batched flush rather than rewriting the bookings file per log entry
+                booking["updated_at"] = now
+                self._schedule_flush()
+                logger.debug(f"✅ Added log to booking {booking_id}")
+                return True
+            except Exception as e:
+                logger.error(f"❌ Failed to add log to booking: {e}")
+                return False
 
-            if not found:
-                logger.warning(f"⚠️  Booking {booking_id} not found for log addition")
+    def append_event(self, booking_id: str, entry: Dict) -> bool:
+        """Append one entry to the booking's JSONL log in DATA_DIR/logs"""
+        with self._lock:
+            try:
+                path = self._events_path(booking_id)
+                events = self._event_tail(booking_id)
+                os.makedirs(LOGS_DIR, exist_ok=True)
+                with open(path, 'ab') as f:
+                    f.write(_dumps_line(entry))
+                events.append(entry)
+                return True
+            except Exception as e:
+                logger.error(f"❌ Failed to append log for booking {booking_id}: {e}")
                 return False
 
-            data["bookings"] = bookings
-            self._write_bookings(data)
-            logger.debug(f"✅ Added log to booking {booking_id}")
-            return True
+    def _remove_events(self, booking_id: str):
+        """Drop a booking's JSONL log from memory and disk"""
+        self._events.pop(booking_id, None)
+        try:
+            os.remove(self._events_path(booking_id))
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            logger.error(f"❌ Failed to add log to booking: {e}")
-            return False
+            logger.warning(f"⚠️ Could not remove log file for booking {booking_id}: {e}")
+
+    def _schedule_flush(self):
+        """Mark the cache dirty and make sure a batched write will happen"""
+        with self._lock:
+            self._dirty = True
+            self._pending_changes += 1
+
+            # Another process could write the file before a delayed flush, so shared files are written now
+            if MULTI_PROCESS or self._pending_changes >= LOG_FLUSH_MAX_PENDING:
+                self.flush()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(LOG_FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self) -> bool:
+        """Write any batched booking changes to disk"""
+        with self._locked():
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+
+            if not self._dirty:
+                return True
+
+            try:
+                self._write_bookings(self._cache)
+                logger.debug(f"💾 Flushed batched booking changes to {self.bookings_file}")
+                return True
+            except Exception as e:
+                logger.error(f"❌ Failed to flush booking changes: {e}")
+                return False
 
     def clear_all_bookings(self) -> bool:
         """Clear all bookings (for testing/reset)"""
-        try:
-            self._write_bookings({"bookings": []})
-            logger.info("🗑️  Cleared all bookings")
-            return True
-        except Exception as e:
-            logger.error(f"❌ Failed to clear bookings: {e}")
-            return False
+        with self._locked():
+            try:
+                self._read_bookings()
+                booking_ids = list(self._index)
+                self._write_bookings({"bookings": []})
+                for booking_id in booking_ids:
+                    self._remove_events(booking_id)
+                logger.info("🗑️  Cleared all bookings")
+                return True
+            except Exception as e:
+                logger.error(f"❌ Failed to clear bookings: {e}")
+                return False
 
 
 # Global instance
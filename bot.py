@@ -2,51 +2,280 @@ import asyncio
 import websockets
 import json
 import os
-from datetime import datetime, timedelta
-import pytz
+import re
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import logging
+import atexit
+import time
 import uuid
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from functools import lru_cache, partial
+from contextvars import ContextVar
+from typing import Annotated
 from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, render_template, send_from_directory, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_sock import Sock
-from config import config_manager
-from booking_storage import booking_storage
+from config import get_config_manager
+from booking_storage import booking_storage, BOOKING_ID_RE
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # msgspec is optional, extensions then always use JSON framing
+    msgspec = None
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional (and unavailable on Windows), fall back to the stock event loop
+    uvloop = None
+
+def ws_dumps(message) -> str:
+    """Encode a websocket message as compact JSON text (orjson when available)"""
+    if orjson is not None:
+        # Frames stay text: the web UI and extension JSON.parse event.data
+        return orjson.dumps(message).decode()
+    return json.dumps(message, separators=(',', ':'))
+
+# MessagePack framing for extensions whose hello advertises "protocol": "msgpack"
+_MSGPACK_ENCODER = msgspec.msgpack.Encoder() if msgspec is not None else None
+_MSGPACK_DECODER = msgspec.msgpack.Decoder() if msgspec is not None else None
+
+def wants_msgpack(hello: dict) -> bool:
+    """Whether an extension hello negotiates MessagePack framing we can serve"""
+    return hello.get("protocol") == "msgpack" and _MSGPACK_ENCODER is not None
+
+# Constant greeting sent to every newly connected client, encoded once
+WELCOME_FRAME = ws_dumps({"type": "welcome", "message": "Bot is ready"})
+
+# Extension greetings echo the framing that was accepted, keyed by wants_msgpack()
+_EXTENSION_WELCOME_FRAMES = {
+    accepted: ws_dumps({"type": "welcome", "message": "Bot is ready", "protocol": "msgpack" if accepted else "json"})
+    for accepted in (True, False)
+}
+
+def extension_welcome_frame(hello: dict) -> str:
+    """Welcome frame for an extension hello, telling it which framing it will get"""
+    return _EXTENSION_WELCOME_FRAMES[wants_msgpack(hello)]
+
+# Errors ws_loads raises for a malformed frame
+WS_DECODE_ERRORS = (json.JSONDecodeError, msgspec.DecodeError) if msgspec is not None else (json.JSONDecodeError,)
+
+def ws_loads(message):
+    """Decode an inbound websocket frame; raises one of WS_DECODE_ERRORS on bad input
+
+    Binary frames carry MessagePack from extensions that negotiated it in their hello
+    and raise msgspec.DecodeError when malformed; text frames raise json.JSONDecodeError.
+    """
+    if isinstance(message, (bytes, bytearray)) and _MSGPACK_DECODER is not None:
+        return _MSGPACK_DECODER.decode(message)
+    if orjson is not None:
+        return orjson.loads(message)
+    return json.loads(message)
 
 # Configure logging
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(
     level=getattr(logging, log_level),
-    format='%(asctime)s [%(levelname)s] %(message)s',
+    format='%(asctime)s [%(levelname)s]%(booking)s %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
 )
+
+# Booking the current task is working on; asyncio tasks and loop callbacks inherit it
+current_booking_id = ContextVar("booking_id", default=None)
+
+class _BookingLogFilter(logging.Filter):
+    """Tag records with the booking in context (runs in the logging thread, before the queue hand-off)"""
+    def filter(self, record):
+        booking_id = current_booking_id.get()
+        record.booking = f" [{booking_id}]" if booking_id else ""
+        return True
+
+# Hand records to a listener thread so log I/O never blocks the event loop or websocket threads
+_root_logger = logging.getLogger()
+_log_listener = QueueListener(SimpleQueue(), *_root_logger.handlers, respect_handler_level=True)
+_queue_handler = QueueHandler(_log_listener.queue)
+_queue_handler.addFilter(_BookingLogFilter())
+_root_logger.handlers = [_queue_handler]
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
 # Get timezone from environment variable or use default
 TIMEZONE = os.getenv("TIMEZONE", "Asia/Kolkata")
 try:
-    LOCAL_TZ = pytz.timezone(TIMEZONE)
+    LOCAL_TZ = ZoneInfo(TIMEZONE)
     logger.info(f"🌍 Using timezone: {TIMEZONE}")
-except pytz.exceptions.UnknownTimeZoneError:
+except ZoneInfoNotFoundError:
     logger.warning(f"⚠️  Unknown timezone '{TIMEZONE}', falling back to Asia/Kolkata")
-    LOCAL_TZ = pytz.timezone("Asia/Kolkata")
+    LOCAL_TZ = ZoneInfo("Asia/Kolkata")
 
 # Get configuration from environment variables
 FLASK_HOST = os.getenv("FLASK_HOST", "0.0.0.0")
 FLASK_PORT = int(os.getenv("PORT", "5000"))
 WEBSOCKET_HOST = os.getenv("WEBSOCKET_HOST", "0.0.0.0")
 WEBSOCKET_PORT = int(os.getenv("WEBSOCKET_PORT", "8765"))
+WEBSOCKET_MAX_SIZE = int(os.getenv("MAX_MESSAGE_SIZE", "1048576"))  # 1MB default
+WEBSOCKET_PING_INTERVAL = int(os.getenv("PING_INTERVAL", "20"))
+WEBSOCKET_PING_TIMEOUT = int(os.getenv("PING_TIMEOUT", "20"))
 MAX_QUANTITY_PER_TAB = int(os.getenv("MAX_QUANTITY_PER_TAB", "50"))
 
 # Detect if running on Render.com (or production environment)
 IS_PRODUCTION = os.getenv("RENDER") is not None or os.getenv("FLASK_ENV") == "production"
 ENABLE_STANDALONE_WEBSOCKET = os.getenv("ENABLE_STANDALONE_WEBSOCKET", "false").lower() == "true"
 
+# Shared state below is only mutated on the main event loop (see call_in_loop)
 connected_clients = set()  # Extension clients (standalone WebSocket - disabled in production)
 extension_clients = set()  # Extension clients via Flask-Sock
 web_clients = set()  # Web interface clients via Flask-Sock
-pending_tasks = {}  # Track pending URL triggers
-active_bookings = {}  # Track active bookings
+msgpack_clients = set()  # Extension clients (either transport) receiving broadcasts as MessagePack
+pending_tasks = {}  # Pending trigger timer handles / stage tasks, keyed by booking_id
 main_event_loop = None  # Store reference to main asyncio event loop
+persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")  # Ordered booking persistence off the broadcast path
+
+def call_in_loop(callback, *args):
+    """Run callback on the main event loop so shared state is only touched from one thread
+
+    Falls back to a direct call when the loop isn't running yet (e.g. during startup).
+    """
+    if main_event_loop and main_event_loop.is_running():
+        main_event_loop.call_soon_threadsafe(callback, *args)
+    else:
+        callback(*args)
+
+# Per-client outgoing queues for web clients, each drained by its own thread
+WEB_SEND_QUEUE_SIZE = 1024
+_web_outboxes = {}  # ws -> SimpleQueue of frames, None stops the sender thread
+
+# Per-client outgoing queues for Flask-Sock extension clients, each drained by its own thread
+EXTENSION_SEND_QUEUE_SIZE = 1024
+_extension_outboxes = {}  # ws -> SimpleQueue of frames, None stops the sender thread
+
+def add_extension_client(ws):
+    """Register a Flask-Sock extension client and start its sender thread"""
+    extension_clients.add(ws)
+    outbox = SimpleQueue()
+    _extension_outboxes[ws] = outbox
+    Thread(target=_extension_sender, args=(ws, outbox), daemon=True, name="extension-sender").start()
+
+def discard_extension_client(ws):
+    """Unregister a Flask-Sock extension client and stop its sender thread"""
+    extension_clients.discard(ws)
+    msgpack_clients.discard(ws)
+    outbox = _extension_outboxes.pop(ws, None)
+    if outbox is not None:
+        outbox.put(None)
+
+def promote_to_extension_client(ws):
+    """Move a web client that sent "hello" over to the extension clients
+
+    The outbox and its sender thread move with it, so the connection keeps a single writer.
+    """
+    global _web_snapshot_dirty
+    outbox = _web_outboxes.pop(ws, None)
+    if outbox is None:
+        add_extension_client(ws)
+        return
+    web_clients.discard(ws)
+    _web_snapshot_dirty = True
+    extension_clients.add(ws)
+    _extension_outboxes[ws] = outbox
+
+def _extension_sender(ws, outbox: SimpleQueue):
+    """Send queued frames to one extension client; a slow client only blocks its own thread"""
+    while (frame := outbox.get()) is not None:
+        if ws in _dropped_clients:
+            break
+        try:
+            ws.send(frame)
+        except Exception as e:
+            logger.error(f"Failed to send to Flask-Sock extension client: {e}")
+            call_in_loop(discard_extension_client, ws)
+            break
+    if ws in _dropped_clients:
+        _close_dropped(ws)
+
+def send_to_client(ws, frame):
+    """Queue a frame for one Flask-Sock client; its sender thread is the only writer to ws"""
+    outbox = _extension_outboxes.get(ws)
+    if outbox is None:
+        outbox = _web_outboxes.get(ws)
+    if outbox is not None:
+        outbox.put(frame)
+
+# Clients dropped for falling behind; their sender thread stops and closes ws itself
+_dropped_clients = set()
+
+def drop_slow_client(ws):
+    """Unregister a client that can't keep up without touching ws from the loop
+
+    The sender thread sees the flag before its next send, skips the backlog and closes ws.
+    """
+    _dropped_clients.add(ws)
+    discard_web_client(ws)
+    discard_extension_client(ws)
+
+def _close_dropped(ws):
+    """Close a dropped client's socket from its sender thread"""
+    _dropped_clients.discard(ws)
+    try:
+        ws.close()
+    except Exception as e:
+        logger.debug(f"Error closing dropped client: {e}")
+
+# Snapshot of (ws, queue) pairs reused by broadcast_to_web until the client set changes
+_web_snapshot = ()
+_web_snapshot_dirty = False
+
+def add_web_client(ws):
+    """Register a web interface client and start its sender thread"""
+    global _web_snapshot_dirty
+    web_clients.add(ws)
+    outbox = SimpleQueue()
+    _web_outboxes[ws] = outbox
+    Thread(target=_web_sender, args=(ws, outbox), daemon=True, name="web-sender").start()
+    _web_snapshot_dirty = True
+
+def discard_web_client(ws):
+    """Unregister a web interface client and stop its sender thread"""
+    global _web_snapshot_dirty
+    if ws in web_clients:
+        web_clients.discard(ws)
+        _web_outboxes.pop(ws).put(None)
+        _web_snapshot_dirty = True
+
+def _web_clients_snapshot() -> tuple:
+    """Return a tuple of (ws, outbox) pairs, rebuilt only after an add/discard"""
+    global _web_snapshot, _web_snapshot_dirty
+    if _web_snapshot_dirty:
+        _web_snapshot = tuple(_web_outboxes.items())
+        _web_snapshot_dirty = False
+    return _web_snapshot
+
+def _web_sender(ws, outbox: SimpleQueue):
+    """Send queued frames to one web client; a slow client only blocks its own thread"""
+    # Flask-Sock sends are blocking; doing them here means no executor hop or loop wake-up per message
+    while (frame := outbox.get()) is not None:
+        if ws in _dropped_clients:
+            break
+        try:
+            ws.send(frame)
+        except Exception as e:
+            logger.error(f"Failed to send to web client: {e}")
+            call_in_loop(discard_web_client, ws)
+            # The client may have been promoted to an extension client since the thread started
+            call_in_loop(discard_extension_client, ws)
+            break
+    if ws in _dropped_clients:
+        _close_dropped(ws)
 
 # ==============================
 # 🎯 Quantity Splitting Logic
@@ -59,17 +288,19 @@ def split_quantities_for_multi_tab(time_slots):
         time_slots: List of dicts with 'time' and 'quantity' keys
 
     Returns:
-        List of dicts with 'time' and 'quantity' keys, where each quantity <= 50
+        Tuple of (list of dicts with 'time' and 'quantity' keys, where each quantity <= 50,
+        list of the matching slot times), built in a single pass
 
     Example:
         Input: [{'time': '9:00 AM', 'quantity': 120}]
-        Output: [
+        Output: ([
             {'time': '9:00 AM', 'quantity': 50},
             {'time': '9:00 AM', 'quantity': 50},
             {'time': '9:00 AM', 'quantity': 20}
-        ]
+        ], ['9:00 AM', '9:00 AM', '9:00 AM'])
     """
     result = []
+    times = []
 
     for slot in time_slots:
         time = slot['time']
@@ -78,29 +309,38 @@ def split_quantities_for_multi_tab(time_slots):
         # If quantity <= 50, no splitting needed
         if quantity <= MAX_QUANTITY_PER_TAB:
             result.append({'time': time, 'quantity': quantity})
+            times.append(time)
         else:
-            # Calculate number of tabs needed
-            num_tabs = (quantity + MAX_QUANTITY_PER_TAB - 1) // MAX_QUANTITY_PER_TAB  # Ceiling division
-
-            # Split quantity across tabs
-            for i in range(num_tabs):
-                remaining = quantity - (i * MAX_QUANTITY_PER_TAB)
-                tab_quantity = min(remaining, MAX_QUANTITY_PER_TAB)
-                result.append({'time': time, 'quantity': tab_quantity})
+            # Full tabs plus one tab for the remainder (if any)
+            full, rem = divmod(quantity, MAX_QUANTITY_PER_TAB)
+            chunks = [MAX_QUANTITY_PER_TAB] * full + ([rem] if rem else [])
+            result.extend({'time': time, 'quantity': q} for q in chunks)
+            times.extend([time] * len(chunks))
 
             # Log the split
-            quantities_str = " + ".join([str(min(MAX_QUANTITY_PER_TAB, quantity - i * MAX_QUANTITY_PER_TAB))
-                                        for i in range(num_tabs)])
-            logger.info(f"📊 Split {quantity} tickets for '{time}' across {num_tabs} tabs ({quantities_str})")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"📊 Split {quantity} tickets for '{time}' across {len(chunks)} tabs ({' + '.join(map(str, chunks))})")
 
-    return result
+    return result, times
 
 # ==============================
 # 🌐 Flask Web Server
 # ==============================
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for faster API responses"""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__,
             template_folder='templates',
             static_folder='static')
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 sock = Sock(app)
 
 @app.route('/')
@@ -117,7 +357,7 @@ def serve_static(path):
 def get_config():
     """Get current configuration (password masked)"""
     try:
-        config = config_manager.get_config_for_api()
+        config = get_config_manager().get_config_for_api()
         return jsonify({
             'success': True,
             'config': config
@@ -143,7 +383,7 @@ def save_config():
             }), 400
 
         # Save configuration
-        success = config_manager.update_config(data)
+        success = get_config_manager().update_config(data)
 
         if success:
             logger.info("✅ Configuration updated via API")
@@ -167,7 +407,7 @@ def save_config():
 def clear_config():
     """Clear configuration"""
     try:
-        success = config_manager.clear_config()
+        success = get_config_manager().clear_config()
 
         if success:
             logger.info("🗑️ Configuration cleared via API")
@@ -228,6 +468,12 @@ def create_booking():
                     'error': f'Missing required field: {field}'
                 }), 400
 
+        if not isinstance(booking['id'], str) or not BOOKING_ID_RE.fullmatch(booking['id']):
+            return jsonify({
+                'success': False,
+                'error': 'Invalid booking id'
+            }), 400
+
         success = booking_storage.save_booking(booking)
 
         if success:
@@ -260,6 +506,12 @@ def update_booking(booking_id):
                 'error': 'No update data provided'
             }), 400
 
+        if updates.get('id', booking_id) != booking_id:
+            return jsonify({
+                'success': False,
+                'error': 'Booking id cannot be changed'
+            }), 400
+
         success = booking_storage.update_booking(booking_id, updates)
 
         if success:
@@ -339,34 +591,46 @@ def add_booking_log(booking_id):
 def websocket_handler(ws):
     """Handle WebSocket connections from web interface AND Chrome extension"""
     # Initially add to web_clients, will move to extension_clients if "hello" message received
-    web_clients.add(ws)
+    call_in_loop(add_web_client, ws)
     is_extension = False
-    logger.info(f"✅ Client connected via Flask-Sock (total web: {len(web_clients)}, extension: {len(extension_clients)})")
+    logger.info("✅ Client connected via Flask-Sock")
+
+    # One inbox per connection, drained by a single coroutine on the main event loop
+    inbox = asyncio.Queue()
+    loop = main_event_loop
+    if loop:
+        asyncio.run_coroutine_threadsafe(drain_inbox(inbox, ws), loop)
+
+    # Bind the per-frame lookups once per connection rather than on every message
+    receive = ws.receive
+    loads = ws_loads
+    enqueue = inbox.put_nowait
 
     try:
         while True:
-            message = ws.receive()
+            message = receive()
             if message:
                 try:
-                    data = json.loads(message)
+                    data = loads(message)
                     msg_type = data.get("type")
 
                     # Check if this is an extension connection (hello message)
                     if msg_type == "hello" and not is_extension:
                         # Move from web_clients to extension_clients
-                        web_clients.discard(ws)
-                        extension_clients.add(ws)
+                        call_in_loop(promote_to_extension_client, ws)
+                        if wants_msgpack(data):
+                            call_in_loop(msgpack_clients.add, ws)
                         is_extension = True
-                        logger.info(f"👋 Chrome extension connected via Flask-Sock (total: {len(extension_clients)})")
+                        logger.info("👋 Chrome extension connected via Flask-Sock")
 
-                        # Send welcome message
-                        ws.send(json.dumps({"type": "welcome", "message": "Bot is ready"}))
+                        # Send welcome message; queued behind the promotion on the main loop
+                        call_in_loop(send_to_client, ws, extension_welcome_frame(data))
 
                         # Send configuration to extension
                         try:
-                            config = config_manager.load_config()
+                            config = get_config_manager().load_config()
                             if config:
-                                ws.send(json.dumps({
+                                call_in_loop(send_to_client, ws, ws_dumps({
                                     "type": "config",
                                     "email": config.get("email"),
                                     "password": config.get("password")
@@ -376,134 +640,161 @@ def websocket_handler(ws):
                             logger.error(f"❌ Failed to send configuration to extension: {e}")
 
                         # Notify web clients
-                        broadcast_to_web({"type": "log", "message": "✅ Chrome extension connected", "level": "success"})
+                        call_in_loop(broadcast_log_to_web, "✅ Chrome extension connected", "success")
                         continue
 
-                    # Schedule the coroutine in the main event loop from Flask thread
-                    if main_event_loop:
-                        if is_extension:
-                            asyncio.run_coroutine_threadsafe(handle_extension_message(data, ws), main_event_loop)
-                        else:
-                            asyncio.run_coroutine_threadsafe(handle_web_message(data, ws), main_event_loop)
+                    # Hand the message to the connection's drain coroutine on the main event loop
+                    if loop:
+                        loop.call_soon_threadsafe(enqueue, (is_extension, data))
                     else:
                         logger.error("❌ Main event loop not available")
-                except json.JSONDecodeError as e:
-                    logger.error(f"❌ Invalid JSON from client: {e}")
+                except WS_DECODE_ERRORS as e:
+                    logger.error(f"❌ Invalid message from client: {e}")
                 except Exception as e:
                     logger.error(f"❌ Error handling message: {e}")
     except Exception as e:
         logger.warning(f"❌ Client disconnected: {e}")
     finally:
+        # Stop the drain coroutine once the queued messages are handled
+        if loop:
+            loop.call_soon_threadsafe(enqueue, None)
+
         if is_extension:
-            extension_clients.discard(ws)
-            logger.info(f"Remaining extension clients: {len(extension_clients)}")
+            call_in_loop(discard_extension_client, ws)
+            logger.info("Extension client disconnected")
         else:
-            web_clients.discard(ws)
-            logger.info(f"Remaining web clients: {len(web_clients)}")
+            call_in_loop(discard_web_client, ws)
+            logger.info("Web client disconnected")
 
-async def handle_web_message(data: dict, ws):
-    """Handle messages from web interface"""
-    msg_type = data.get("type")
+async def drain_inbox(inbox: asyncio.Queue, ws):
+    """Dispatch messages queued by one Flask-Sock connection, in arrival order
 
-    if msg_type == "web_hello":
-        ws.send(json.dumps({"type": "welcome", "message": "Bot is ready"}))
-        logger.info("👋 Web interface connected")
+    Items are (is_extension, data) tuples; None ends the loop.
+    """
+    while True:
+        item = await inbox.get()
+        if item is None:
+            break
 
-    elif msg_type == "schedule_booking":
-        # Schedule a new booking from web interface
+        is_extension, data = item
         try:
-            booking_id = str(uuid.uuid4())[:8]
-            url = data.get("url")
-            email = data.get("email")
-            password = data.get("password")
-            booking_date = data.get("booking_date")
-
-            # Support both old format (separate fields) and new format (combined datetime)
-            trigger_datetime = data.get("trigger_datetime")
-            trigger_time = data.get("trigger_time")
-            time_format = data.get("time_format")
-            time_slots = data.get("time_slots", [])
-
-            # Parse trigger time - support both formats for backward compatibility
-            if trigger_datetime:
-                # New format: combined datetime string
-                target_time = parse_trigger_datetime(trigger_datetime)
-            elif trigger_time and time_format:
-                # Old format: separate time and format
-                target_time = parse_trigger_time(trigger_time, time_format)
+            if is_extension:
+                await handle_extension_message(data, ws)
             else:
-                raise ValueError("Either trigger_datetime or (trigger_time + time_format) must be provided")
-
-            # Convert time_slots to slots_with_quantities format
-            # Split quantities > 50 into multiple tabs
-            original_slots_count = len(time_slots)
-            slots_with_quantities = split_quantities_for_multi_tab(time_slots)
-            time_slots_list = [slot['time'] for slot in slots_with_quantities]
-
-            # Log multi-tab booking info
-            if len(slots_with_quantities) > original_slots_count:
-                total_tabs = len(slots_with_quantities)
-                logger.info(f"🔀 Multi-tab booking: {original_slots_count} slot(s) split into {total_tabs} tab(s) due to quantity limits")
-
-                # Broadcast to web clients
-                broadcast_to_web({
-                    "type": "log",
-                    "message": f"🔀 Splitting booking into {total_tabs} tabs to handle quantity limits",
-                    "level": "info"
-                })
-
-            # Store booking info
-            # Format trigger_time for display (use combined datetime if available, otherwise use legacy format)
-            trigger_time_display = trigger_datetime if trigger_datetime else trigger_time
-
-            booking = {
-                "id": booking_id,
-                "url": url,
-                "booking_date": booking_date,
-                "trigger_time": trigger_time_display,
-                "trigger_datetime": target_time.isoformat(),  # Store parsed datetime for reference
-                "time_slots": time_slots,
-                "status": "scheduled",
-                "created_at": datetime.now().isoformat()
-            }
-            active_bookings[booking_id] = booking
-
-            # Persist booking to storage
-            booking_storage.save_booking(booking)
+                await handle_web_message(data, ws)
+        except Exception as e:
+            logger.error(f"❌ Error handling message: {e}")
 
-            # Send confirmation to web client
-            ws.send(json.dumps({
-                "type": "booking_scheduled",
-                "booking_id": booking_id,
-                "booking": booking
-            }))
+async def _handle_web_hello(data: dict, ws):
+    """Greet a newly connected web interface"""
+    send_to_client(ws, WELCOME_FRAME)
+    logger.info("👋 Web interface connected")
 
-            # Schedule the booking
-            asyncio.create_task(schedule_and_trigger(
-                target_time, url, email, password,
-                time_slots_list, booking_date, slots_with_quantities,
-                booking_id
-            ))
+async def _handle_schedule_booking(data: dict, ws):
+    """Schedule a new booking from web interface"""
+    try:
+        booking_id = str(uuid.uuid4())[:8]
+        url = data.get("url")
+        email = data.get("email")
+        password = data.get("password")
+        booking_date = data.get("booking_date")
+
+        # Support both old format (separate fields) and new format (combined datetime)
+        trigger_datetime = data.get("trigger_datetime")
+        trigger_time = data.get("trigger_time")
+        time_format = data.get("time_format")
+        time_slots = data.get("time_slots", [])
+
+        # Parse trigger time - support both formats for backward compatibility
+        if trigger_datetime:
+            # New format: combined datetime string
+            target_time = parse_trigger_datetime(trigger_datetime)
+        elif trigger_time and time_format:
+            # Old format: separate time and format
+            target_time = parse_trigger_time(trigger_time, time_format)
+        else:
+            raise ValueError("Either trigger_datetime or (trigger_time + time_format) must be provided")
+
+        # Convert time_slots to slots_with_quantities format
+        # Split quantities > 50 into multiple tabs
+        original_slots_count = len(time_slots)
+        slots_with_quantities, time_slots_list = split_quantities_for_multi_tab(time_slots)
+
+        # Log multi-tab booking info
+        if len(slots_with_quantities) > original_slots_count:
+            total_tabs = len(slots_with_quantities)
+            logger.info(f"🔀 Multi-tab booking: {original_slots_count} slot(s) split into {total_tabs} tab(s) due to quantity limits")
+
+            # Broadcast to web clients
+            broadcast_log_to_web(f"🔀 Splitting booking into {total_tabs} tabs to handle quantity limits")
+
+        # Store booking info
+        # Format trigger_time for display (use combined datetime if available, otherwise use legacy format)
+        trigger_time_display = trigger_datetime if trigger_datetime else trigger_time
+
+        booking = {
+            "id": booking_id,
+            "url": url,
+            "booking_date": booking_date,
+            "trigger_time": trigger_time_display,
+            "trigger_datetime": target_time.isoformat(),  # Store parsed datetime for reference
+            "time_slots": time_slots,
+            "status": "scheduled",
+            "created_at": datetime.now().isoformat()
+        }
+        # Persist booking to storage (the single source of truth for bookings)
+        booking_storage.save_booking(booking)
+
+        # Send confirmation to web client
+        send_to_client(ws, ws_dumps({
+            "type": "booking_scheduled",
+            "booking_id": booking_id,
+            "booking": booking
+        }))
+
+        # Schedule the booking
+        asyncio.create_task(schedule_and_trigger(
+            target_time, url, email, password,
+            time_slots_list, booking_date, slots_with_quantities,
+            booking_id
+        ))
+
+        logger.info(f"✅ Booking {booking_id} scheduled from web interface")
 
-            logger.info(f"✅ Booking {booking_id} scheduled from web interface")
+    except Exception as e:
+        logger.error(f"❌ Failed to schedule booking: {e}")
+        send_to_client(ws, ws_dumps({
+            "type": "error",
+            "message": f"Failed to schedule booking: {str(e)}"
+        }))
+
+async def _handle_cancel_booking(data: dict, ws):
+    """Cancel a scheduled booking"""
+    booking_id = data.get("booking_id")
+    pending = pending_tasks.pop(booking_id, None)
+    if pending:
+        # Timer handle before the first stage, Task once the stages are running
+        pending.cancel()
+    if booking_storage.delete_booking(booking_id):
+        logger.info(f"🗑️ Booking {booking_id} cancelled")
+
+async def _handle_web_ping(data: dict, ws):
+    """Answer a web interface keepalive ping"""
+    send_to_client(ws, ws_dumps({"type": "pong", "timestamp": time.time()}))
+
+# Web interface message type -> handler
+_WEB_DISPATCH = {
+    "web_hello": _handle_web_hello,
+    "schedule_booking": _handle_schedule_booking,
+    "cancel_booking": _handle_cancel_booking,
+    "ping": _handle_web_ping,
+}
 
-        except Exception as e:
-            logger.error(f"❌ Failed to schedule booking: {e}")
-            ws.send(json.dumps({
-                "type": "error",
-                "message": f"Failed to schedule booking: {str(e)}"
-            }))
-
-    elif msg_type == "cancel_booking":
-        booking_id = data.get("booking_id")
-        if booking_id in active_bookings:
-            del active_bookings[booking_id]
-            # Delete from persistent storage
-            booking_storage.delete_booking(booking_id)
-            logger.info(f"🗑️ Booking {booking_id} cancelled")
-
-    elif msg_type == "ping":
-        ws.send(json.dumps({"type": "pong", "timestamp": datetime.now().timestamp()}))
+async def handle_web_message(data: dict, ws):
+    """Handle messages from web interface"""
+    handler = _WEB_DISPATCH.get(data.get("type"))
+    if handler:
+        await handler(data, ws)
 
 def parse_trigger_time(trigger_time: str, time_format: str):
     """Parse trigger time from web interface (legacy format - separate time field)"""
@@ -517,8 +808,8 @@ def parse_trigger_time(trigger_time: str, time_format: str):
         # Format: HH:MM or H:MM AM/PM
         trigger_time = trigger_time.strip()
 
-        # Check if it's 12-hour format (contains AM/PM)
-        if 'AM' in trigger_time.upper() or 'PM' in trigger_time.upper():
+        # Check if it's 12-hour format (ends with AM/PM, as "%I:%M %p" requires)
+        if trigger_time[-2:].upper() in ('AM', 'PM'):
             # Parse 12-hour format
             time_obj = datetime.strptime(trigger_time, "%I:%M %p")
             target_time = now.replace(hour=time_obj.hour, minute=time_obj.minute, second=0, microsecond=0)
@@ -533,6 +824,39 @@ def parse_trigger_time(trigger_time: str, time_format: str):
 
         return target_time
 
+# Datetime formats accepted by parse_trigger_datetime, tried in order
+TRIGGER_DATETIME_FORMATS = (
+    "%Y-%m-%dT%H:%M",           # ISO format: 2025-12-15T10:00
+    "%Y-%m-%d %H:%M",           # Space-separated: 2025-12-15 10:00
+    "%Y-%m-%d %I:%M %p",        # 12-hour with AM/PM: 2025-12-15 10:00 AM
+    "%B %d, %Y %H:%M",          # Flatpickr format: December 15, 2025 10:00
+    "%B %d, %Y %I:%M %p",       # Flatpickr 12-hour: December 15, 2025 10:00 AM
+    "%m/%d/%Y %H:%M",           # US format: 12/15/2025 10:00
+    "%m/%d/%Y %I:%M %p",        # US 12-hour: 12/15/2025 10:00 AM
+    "%d/%m/%Y %H:%M",           # European format: 15/12/2025 10:00
+    "%d/%m/%Y %I:%M %p",        # European 12-hour: 15/12/2025 10:00 AM
+)
+
+@lru_cache(maxsize=256)
+def _parse_naive_datetime(trigger_datetime: str):
+    """Parse a trigger datetime string into (format, naive datetime), or (None, None)"""
+    # Fast path: "YYYY-MM-DDTHH:MM" / "YYYY-MM-DD HH:MM" via the C-accelerated ISO parser
+    if len(trigger_datetime) == 16:
+        try:
+            parsed_dt = datetime.fromisoformat(trigger_datetime)
+            if parsed_dt.tzinfo is None:
+                return "ISO 8601", parsed_dt
+        except ValueError:
+            pass
+
+    for fmt in TRIGGER_DATETIME_FORMATS:
+        try:
+            return fmt, datetime.strptime(trigger_datetime, fmt)
+        except ValueError:
+            continue
+
+    return None, None
+
 def parse_trigger_datetime(trigger_datetime: str):
     """Parse combined trigger datetime from web interface (new format)
 
@@ -543,34 +867,14 @@ def parse_trigger_datetime(trigger_datetime: str):
     """
     trigger_datetime = trigger_datetime.strip()
 
-    # List of datetime formats to try
-    formats = [
-        "%Y-%m-%dT%H:%M",           # ISO format: 2025-12-15T10:00
-        "%Y-%m-%d %H:%M",           # Space-separated: 2025-12-15 10:00
-        "%Y-%m-%d %I:%M %p",        # 12-hour with AM/PM: 2025-12-15 10:00 AM
-        "%B %d, %Y %H:%M",          # Flatpickr format: December 15, 2025 10:00
-        "%B %d, %Y %I:%M %p",       # Flatpickr 12-hour: December 15, 2025 10:00 AM
-        "%m/%d/%Y %H:%M",           # US format: 12/15/2025 10:00
-        "%m/%d/%Y %I:%M %p",        # US 12-hour: 12/15/2025 10:00 AM
-        "%d/%m/%Y %H:%M",           # European format: 15/12/2025 10:00
-        "%d/%m/%Y %I:%M %p",        # European 12-hour: 15/12/2025 10:00 AM
-    ]
-
-    target_time = None
-    for fmt in formats:
-        try:
-            # Parse the datetime string
-            parsed_dt = datetime.strptime(trigger_datetime, fmt)
-            # Apply local timezone
-            target_time = LOCAL_TZ.localize(parsed_dt)
-            logger.info(f"✅ Parsed trigger datetime '{trigger_datetime}' using format '{fmt}' -> {target_time}")
-            break
-        except ValueError:
-            continue
-
-    if target_time is None:
+    fmt, parsed_dt = _parse_naive_datetime(trigger_datetime)
+    if parsed_dt is None:
         raise ValueError(f"Could not parse trigger datetime: '{trigger_datetime}'. Supported formats: YYYY-MM-DD HH:MM, Month DD, YYYY HH:MM, etc.")
 
+    # Apply local timezone
+    target_time = parsed_dt.replace(tzinfo=LOCAL_TZ)
+    logger.info(f"✅ Parsed trigger datetime '{trigger_datetime}' using format '{fmt}' -> {target_time}")
+
     # Validate that the datetime is in the future
     now = datetime.now(LOCAL_TZ)
     if target_time <= now:
@@ -578,246 +882,311 @@ def parse_trigger_datetime(trigger_datetime: str):
 
     return target_time
 
-async def handle_extension_message(data: dict, ws):
-    """Handle messages from Chrome extension via Flask-Sock"""
-    msg_type = data.get("type")
-    booking_id = data.get("booking_id")  # Extract booking_id from all messages
+async def _handle_ack(data: dict, ws):
+    """Acknowledgment that URL was stored"""
+    booking_id = data.get("booking_id")
+    status = data.get("status")
+    url = data.get("url")
+    if status == "stored":
+        logger.info("✅ Extension confirmed URL stored: %s", url)
+        broadcast_log_to_web(f"✅ Extension confirmed URL stored", "success")
 
-    if msg_type == "ack":
-        # Acknowledgment that URL was stored
-        status = data.get("status")
-        url = data.get("url")
-        if status == "stored":
-            logger.info(f"✅ Extension confirmed URL stored: {url}")
-            broadcast_to_web({"type": "log", "message": f"✅ Extension confirmed URL stored", "level": "success"})
+        # Update booking status
+        if booking_id:
+            queue_booking_update(booking_id, "extension_ready", "Extension confirmed URL stored and ready")
+    elif status == "error":
+        logger.error("❌ Extension failed to store URL: %s", data.get('error'))
+        broadcast_log_to_web(f"❌ Extension failed to store URL: {data.get('error')}", "error")
 
-            # Update booking status
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "extension_ready",
-                    "message": "Extension confirmed URL stored and ready"
-                })
-        elif status == "error":
-            logger.error(f"❌ Extension failed to store URL: {data.get('error')}")
-            broadcast_to_web({"type": "log", "message": f"❌ Extension failed to store URL: {data.get('error')}", "level": "error"})
+        # Update booking status
+        if booking_id:
+            queue_booking_update(booking_id, "error", f"Extension error: {data.get('error')}")
+
+async def _handle_session_status(data: dict, ws):
+    """Session check result"""
+    booking_id = data.get("booking_id")
+    status = data.get("status")
+    url = data.get("url")
+    username = data.get("username")
+    if status == "already_logged_in":
+        logger.info("✅ User already logged in as '%s' on %s", username, url)
+        broadcast_log_to_web(f"✅ Already logged in as '{username}'", "success")
+
+        # Update booking status
+        if booking_id:
+            queue_booking_update(booking_id, "logged_in", f"Already logged in as '{username}'")
+    elif status == "not_logged_in":
+        logger.info("🔓 User not logged in on %s, will attempt auto-login", url)
+        broadcast_log_to_web("🔓 Not logged in, attempting auto-login...")
 
-            # Update booking status
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "error",
-                    "message": f"Extension error: {data.get('error')}"
-                })
-
-    elif msg_type == "session_status":
-        # Session check result
-        status = data.get("status")
-        url = data.get("url")
+        # Update booking status
+        if booking_id:
+            queue_booking_update(booking_id, "logging_in", "Attempting auto-login...")
+
+async def _handle_login_result(data: dict, ws):
+    """Login attempt result"""
+    booking_id = data.get("booking_id")
+    status = data.get("status")
+    url = data.get("url")
+    if status == "success":
         username = data.get("username")
-        if status == "already_logged_in":
-            logger.info(f"✅ User already logged in as '{username}' on {url}")
-            broadcast_to_web({"type": "log", "message": f"✅ Already logged in as '{username}'", "level": "success"})
+        logger.info("🎉 LOGIN SUCCESS: Logged in as '%s' on %s", username, url)
+        broadcast_log_to_web(f"🎉 Login successful as '{username}'", "success")
 
-            # Update booking status
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "logged_in",
-                    "message": f"Already logged in as '{username}'"
-                })
-        elif status == "not_logged_in":
-            logger.info(f"🔓 User not logged in on {url}, will attempt auto-login")
-            broadcast_to_web({"type": "log", "message": "🔓 Not logged in, attempting auto-login...", "level": "info"})
+        # Update booking status
+        if booking_id:
+            queue_booking_update(booking_id, "logged_in", f"Login successful as '{username}'")
+    elif status == "failed":
+        error = data.get("error")
+        logger.error("❌ LOGIN FAILED on %s: %s", url, error)
+        broadcast_log_to_web(f"❌ Login failed: {error}", "error")
 
-            # Update booking status
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "logging_in",
-                    "message": "Attempting auto-login..."
-                })
-
-    elif msg_type == "login_result":
-        # Login attempt result
-        status = data.get("status")
-        url = data.get("url")
-        if status == "success":
+        # Update booking status
+        if booking_id:
+            queue_booking_update(booking_id, "error", f"Login failed: {error}")
+
+async def _handle_pre_login_result(data: dict, ws):
+    """Pre-login trigger result"""
+    booking_id = data.get("booking_id")
+    status = data.get("status")
+    url = data.get("url")
+    if status == "success":
+        if data.get("alreadyLoggedIn"):
             username = data.get("username")
-            logger.info(f"🎉 LOGIN SUCCESS: Logged in as '{username}' on {url}")
-            broadcast_to_web({"type": "log", "message": f"🎉 Login successful as '{username}'", "level": "success"})
+            logger.info("✅ Pre-login check: Already logged in as '%s' on %s", username, url)
+            broadcast_log_to_web(f"✅ Pre-login: Already logged in as '{username}'", "success")
 
             # Update booking status
             if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "logged_in",
-                    "message": f"Login successful as '{username}'"
-                })
-        elif status == "failed":
-            error = data.get("error")
-            logger.error(f"❌ LOGIN FAILED on {url}: {error}")
-            broadcast_to_web({"type": "log", "message": f"❌ Login failed: {error}", "level": "error"})
+                queue_booking_update(booking_id, "pre_login_complete", f"Pre-login: Already logged in as '{username}'")
+        elif data.get("loggedIn"):
+            username = data.get("username")
+            logger.info("🎉 Pre-login: Successfully logged in as '%s' on %s", username, url)
+            broadcast_log_to_web(f"🎉 Pre-login: Logged in as '{username}'", "success")
 
             # Update booking status
             if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "error",
-                    "message": f"Login failed: {error}"
-                })
-
-    elif msg_type == "pre_login_result":
-        # Pre-login trigger result
-        status = data.get("status")
-        url = data.get("url")
-        if status == "success":
-            if data.get("alreadyLoggedIn"):
-                username = data.get("username")
-                logger.info(f"✅ Pre-login check: Already logged in as '{username}' on {url}")
-                broadcast_to_web({"type": "log", "message": f"✅ Pre-login: Already logged in as '{username}'", "level": "success"})
-
-                # Update booking status
-                if booking_id:
-                    broadcast_to_web({
-                        "type": "booking_update",
-                        "booking_id": booking_id,
-                        "status": "pre_login_complete",
-                        "message": f"Pre-login: Already logged in as '{username}'"
-                    })
-            elif data.get("loggedIn"):
-                username = data.get("username")
-                logger.info(f"🎉 Pre-login: Successfully logged in as '{username}' on {url}")
-                broadcast_to_web({"type": "log", "message": f"🎉 Pre-login: Logged in as '{username}'", "level": "success"})
-
-                # Update booking status
-                if booking_id:
-                    broadcast_to_web({
-                        "type": "booking_update",
-                        "booking_id": booking_id,
-                        "status": "pre_login_complete",
-                        "message": f"Pre-login: Logged in as '{username}'"
-                    })
-        elif status == "error":
-            error = data.get("error")
-            logger.error(f"❌ Pre-login failed on {url}: {error}")
-            broadcast_to_web({"type": "log", "message": f"❌ Pre-login failed: {error}", "level": "error"})
+                queue_booking_update(booking_id, "pre_login_complete", f"Pre-login: Logged in as '{username}'")
+    elif status == "error":
+        error = data.get("error")
+        logger.error("❌ Pre-login failed on %s: %s", url, error)
+        broadcast_log_to_web(f"❌ Pre-login failed: {error}", "error")
 
-            # Update booking status
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "error",
-                    "message": f"Pre-login failed: {error}"
-                })
-
-    elif msg_type == "result":
-        # Final result from extension
-        status = data.get("status")
-        message = data.get("message", "")
+        # Update booking status
+        if booking_id:
+            queue_booking_update(booking_id, "error", f"Pre-login failed: {error}")
 
-        if status == "success":
-            logger.info(f"✅ Extension completed successfully: {message}")
-            broadcast_to_web({"type": "log", "message": f"✅ Booking completed: {message}", "level": "success"})
+async def _handle_result(data: dict, ws):
+    """Final result from extension"""
+    booking_id = data.get("booking_id")
+    status = data.get("status")
+    message = data.get("message", "")
 
-            # Update booking status to completed
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "completed",
-                    "message": message or "Booking completed successfully"
-                })
-        elif status == "partial":
-            logger.warning(f"⚠️ Extension completed with partial success: {message}")
-            broadcast_to_web({"type": "log", "message": f"⚠️ Partial success: {message}", "level": "warning"})
-
-            # Update booking status to partial
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "partial",
-                    "message": message or "Some bookings succeeded, some failed"
-                })
-        elif status == "error":
-            error = data.get("error", message)
-            logger.error(f"❌ Extension error: {error}")
-            broadcast_to_web({"type": "log", "message": f"❌ Error: {error}", "level": "error"})
+    if status == "success":
+        logger.info("✅ Extension completed successfully: %s", message)
+        broadcast_log_to_web(f"✅ Booking completed: {message}", "success")
 
-            # Update booking status to failed
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "failed",
-                    "message": error or "Booking failed"
-                })
-
-    elif msg_type == "booking_result":
-        # Detailed result for individual slot booking
-        slot = data.get("slot")
-        slot_status = data.get("status")
-        steps = data.get("steps", {})
-        timings = data.get("timings", {})
-        error = data.get("error")
-        requested_qty = data.get("requestedQuantity")
-        available_qty = data.get("availableQuantity")
-        actual_qty = data.get("actualQuantity")
-
-        # Log detailed result
-        if slot_status == "success":
-            logger.info(f"✅ Slot '{slot}' booked successfully - Quantity: {actual_qty}/{requested_qty}")
-            msg = f"✅ Slot '{slot}' booked: {actual_qty} ticket(s)"
-            if available_qty and available_qty < requested_qty:
-                msg += f" (only {available_qty} available)"
-            broadcast_to_web({"type": "log", "message": msg, "level": "success"})
-        else:
-            logger.error(f"❌ Slot '{slot}' booking failed: {error}")
-            broadcast_to_web({"type": "log", "message": f"❌ Slot '{slot}' failed: {error}", "level": "error"})
+        # Update booking status to completed
+        if booking_id:
+            queue_booking_update(booking_id, "completed", message or "Booking completed successfully")
+    elif status == "partial":
+        logger.warning("⚠️ Extension completed with partial success: %s", message)
+        broadcast_log_to_web(f"⚠️ Partial success: {message}", "warning")
 
-        # Update booking with detailed event log
+        # Update booking status to partial
         if booking_id:
-            event_log = {
-                "timestamp": data.get("timestamp", datetime.now(timezone.utc).isoformat()),
-                "slot": slot,
-                "status": slot_status,
-                "steps": steps,
-                "timings": timings,
-                "quantities": {
-                    "requested": requested_qty,
-                    "available": available_qty,
-                    "actual": actual_qty
-                },
-                "error": error
-            }
+            queue_booking_update(booking_id, "partial", message or "Some bookings succeeded, some failed")
+    elif status == "error":
+        error = data.get("error", message)
+        logger.error("❌ Extension error: %s", error)
+        broadcast_log_to_web(f"❌ Error: {error}", "error")
 
-            broadcast_to_web({
-                "type": "booking_event_log",
-                "booking_id": booking_id,
-                "event": event_log
-            })
+        # Update booking status to failed
+        if booking_id:
+            queue_booking_update(booking_id, "failed", error or "Booking failed")
+
+async def _handle_booking_result(data: dict, ws):
+    """Detailed result for individual slot booking"""
+    booking_id = data.get("booking_id")
+    slot = data.get("slot")
+    slot_status = data.get("status")
+    steps = data.get("steps", {})
+    timings = data.get("timings", {})
+    error = data.get("error")
+    requested_qty = data.get("requestedQuantity")
+    available_qty = data.get("availableQuantity")
+    actual_qty = data.get("actualQuantity")
+
+    # Log detailed result
+    if slot_status == "success":
+        logger.info("✅ Slot '%s' booked successfully - Quantity: %s/%s", slot, actual_qty, requested_qty)
+        msg = f"✅ Slot '{slot}' booked: {actual_qty} ticket(s)"
+        if available_qty and available_qty < requested_qty:
+            msg += f" (only {available_qty} available)"
+        broadcast_log_to_web(msg, "success")
+    else:
+        logger.error("❌ Slot '%s' booking failed: %s", slot, error)
+        broadcast_log_to_web(f"❌ Slot '{slot}' failed: {error}", "error")
+
+    # Update booking with detailed event log
+    if booking_id:
+        event_log = {
+            "timestamp": data.get("timestamp", datetime.now(timezone.utc).isoformat()),
+            "slot": slot,
+            "status": slot_status,
+            "steps": steps,
+            "timings": timings,
+            "quantities": {
+                "requested": requested_qty,
+                "available": available_qty,
+                "actual": actual_qty
+            },
+            "error": error
+        }
+
+        broadcast_to_web({
+            "type": "booking_event_log",
+            "booking_id": booking_id,
+            "event": event_log
+        })
+
+# Extension message type -> handler
+_EXT_DISPATCH = {
+    "ack": _handle_ack,
+    "session_status": _handle_session_status,
+    "login_result": _handle_login_result,
+    "pre_login_result": _handle_pre_login_result,
+    "result": _handle_result,
+    "booking_result": _handle_booking_result,
+}
+
+async def handle_extension_message(data: dict, ws):
+    """Handle messages from Chrome extension via Flask-Sock"""
+    handler = _EXT_DISPATCH.get(data.get("type"))
+    if handler:
+        await handler(data, ws)
+
+# Pending booking_update messages, coalesced per booking before they are broadcast
+BOOKING_UPDATE_DEBOUNCE = 0.05  # seconds
+_pending_updates = {}
+_update_flush_handle = None
+
+def queue_booking_update(booking_id: str, status: str, message: str):
+    """Queue a booking_update broadcast; rapid transitions collapse into the latest state
+
+    Must be called from the main event loop.
+    """
+    global _update_flush_handle
+    _pending_updates[booking_id] = {
+        "type": "booking_update",
+        "booking_id": booking_id,
+        "status": status,
+        "message": message
+    }
+    if _update_flush_handle is None:
+        _update_flush_handle = asyncio.get_running_loop().call_later(BOOKING_UPDATE_DEBOUNCE, _flush_booking_updates)
+
+def _flush_booking_updates():
+    """Broadcast (and persist) the latest queued update for each booking"""
+    global _update_flush_handle
+    _update_flush_handle = None
+    updates = list(_pending_updates.values())
+    _pending_updates.clear()
+    for update in updates:
+        broadcast_to_web(update)
 
 def broadcast_to_web(message: dict):
     """Send message to all web clients (synchronous for Flask-Sock)"""
+    if message.get("type") == "booking_update":
+        # A direct update supersedes any older coalesced one still waiting to be sent
+        _pending_updates.pop(message.get("booking_id"), None)
+
     if web_clients:
-        msg = json.dumps(message)
-        for ws in list(web_clients):  # Create a copy to avoid modification during iteration
-            try:
-                ws.send(msg)
-            except Exception as e:
-                logger.error(f"Failed to send to web client: {e}")
-                web_clients.discard(ws)  # Remove disconnected client
+        # Encode once for every client
+        _send_to_web_clients(ws_dumps(message))
+
+    # Persist booking updates and logs to storage without blocking the fan-out
+    if message.get("booking_id"):
+        persist_executor.submit(_persist_booking_message, message)
+
+def broadcast_web_batch(messages: list):
+    """Send several messages to web clients as one {"type": "batch"} frame and persist each"""
+    for message in messages:
+        if message.get("type") == "booking_update":
+            _pending_updates.pop(message.get("booking_id"), None)
+
+    if web_clients:
+        _send_to_web_clients(ws_dumps({"type": "batch", "messages": messages}))
+
+    for message in messages:
+        if message.get("booking_id"):
+            persist_executor.submit(_persist_booking_message, message)
+
+def _stage_update_messages(booking_id: str, status: str, message: str, log_message: str, event_type: str) -> list:
+    """booking_update + booking_event_log pair sent at each trigger stage"""
+    return [
+        {"type": "booking_update", "booking_id": booking_id, "status": status, "message": message},
+        {"type": "booking_event_log", "booking_id": booking_id, "message": log_message, "level": "info", "event_type": event_type},
+    ]
+
+# Pre-encoded frame for the common {"type": "log", ...} broadcast; only the fields get escaped
+_LOG_FRAME_TEMPLATE = '{"type":"log","message":%s,"level":%s}'
+
+@lru_cache(maxsize=256)
+def _log_frame(message: str, level: str) -> str:
+    """Encode a log frame; recurring static messages are served from the cache"""
+    return _LOG_FRAME_TEMPLATE % (ws_dumps(message), ws_dumps(level))
+
+def broadcast_log_to_web(message: str, level: str = "info"):
+    """Send a log line to all web clients without building and encoding a dict"""
+    if web_clients:
+        _send_to_web_clients(_log_frame(message, level))
+
+# Pre-encoded frame for booking event logs; the stored log entry is the only dict built
+_EVENT_LOG_FRAME_TEMPLATE = '{"type":"booking_event_log","booking_id":%s,"message":%s,"level":%s,"event_type":%s}'
+
+def broadcast_event_log_to_web(booking_id: str, message: str, level: str = "info", event_type: str = "general"):
+    """Send a booking event log to all web clients and persist it"""
+    if web_clients:
+        _send_to_web_clients(_EVENT_LOG_FRAME_TEMPLATE % (
+            ws_dumps(booking_id), ws_dumps(message), ws_dumps(level), ws_dumps(event_type)
+        ))
+
+    if booking_id:
+        log_entry = {
+            "message": message,
+            "level": level,
+            "event_type": event_type,
+            "timestamp": datetime.now().isoformat()
+        }
+        persist_executor.submit(_persist_event_log, booking_id, log_entry)
+
+def _persist_event_log(booking_id: str, log_entry: dict):
+    """Persist one booking event log entry to storage"""
+    try:
+        booking_storage.add_log_to_booking(booking_id, log_entry)
+        logger.info(f"💾 Persisted log for booking {booking_id}")
+    except Exception as e:
+        logger.error(f"❌ Failed to persist booking message: {e}")
 
-    # Persist booking updates and logs to storage
-    _persist_booking_message(message)
+def _send_to_web_clients(msg: str):
+    """Queue an encoded frame for every web client"""
+    for ws, outbox in _web_clients_snapshot():
+        if outbox.qsize() >= WEB_SEND_QUEUE_SIZE:
+            # Client isn't keeping up; drop it rather than buffer without bound
+            logger.warning("⚠️ Web client send queue full, disconnecting slow client")
+            drop_slow_client(ws)
+            continue
+        outbox.put(msg)
+
+def _event_log_entry(event: dict) -> dict:
+    """Build the stored log entry for one booking event log"""
+    return {
+        "message": event.get("message", ""),
+        "level": event.get("level", "info"),
+        "event_type": event.get("event_type", "general"),
+        "timestamp": datetime.now().isoformat()
+    }
 
 def _persist_booking_message(message: dict):
     """Persist booking updates and logs to JSON storage"""
@@ -837,423 +1206,428 @@ def _persist_booking_message(message: dict):
                 updates["message"] = message.get("message")
 
             if updates:
-                booking_storage.update_booking(booking_id, updates)
+                booking_storage.update_booking(booking_id, updates, batched=True)
                 logger.info(f"💾 Persisted status update for booking {booking_id}: {updates}")
 
         # Handle booking event logs
         elif msg_type == "booking_event_log":
-            log_entry = {
-                "message": message.get("message", ""),
-                "level": message.get("level", "info"),
-                "event_type": message.get("event_type", "general"),
-                "timestamp": datetime.now().isoformat()
-            }
-            booking_storage.add_log_to_booking(booking_id, log_entry)
+            booking_storage.add_log_to_booking(booking_id, _event_log_entry(message))
             logger.info(f"💾 Persisted log for booking {booking_id}")
+
+        # Handle batched booking event logs
+        elif msg_type == "booking_event_log_batch":
+            entries = message.get("entries", [])
+            for entry in entries:
+                booking_storage.add_log_to_booking(booking_id, _event_log_entry(entry))
+            logger.info(f"💾 Persisted {len(entries)} logs for booking {booking_id}")
     except Exception as e:
         logger.error(f"❌ Failed to persist booking message: {e}")
 
 def run_flask():
     """Run Flask server in a separate thread"""
-    app.run(host=FLASK_HOST, port=FLASK_PORT, debug=False, use_reloader=False)
+    if IS_PRODUCTION:
+        # Per-request access lines from werkzeug add a log write to every HTTP poll and asset
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    # Threaded so each Flask-Sock connection gets its own worker instead of blocking the others
+    app.run(host=FLASK_HOST, port=FLASK_PORT, debug=False, use_reloader=False, threaded=True)
 
 # ==============================
 # 🌐 WebSocket Handler
 # ==============================
+# Keepalive frames as the extension serializes them (JSON.stringify, no whitespace)
+_PING_FRAME = '{"type":"ping"}'
+_KEEPALIVE_FRAMES = frozenset((_PING_FRAME, '{"type":"pong"}'))
+
 async def handler(websocket):
     connected_clients.add(websocket)
     logger.info(f"✅ Client connected: {websocket.remote_address} (total {len(connected_clients)})")
 
+    # Messages are handled by a separate task, so the next frame is read while the previous one fans out
+    inbox = asyncio.Queue()
+    asyncio.create_task(drain_client_inbox(inbox, websocket))
+
     try:
         async for message in websocket:
-            logger.info(f"📨 Received from {websocket.remote_address}: {message}")
+            logger.debug("📨 Received from %s: %s", websocket.remote_address, message)
+
+            # Keepalive fast path: exact ping/pong frames skip JSON parsing and dispatch
+            if message in _KEEPALIVE_FRAMES:
+                if message == _PING_FRAME:
+                    await websocket.send(ws_dumps({"type": "pong", "timestamp": time.time()}))
+                continue
+
             try:
-                data = json.loads(message)
-                await handle_client_message(data, websocket)
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ Invalid JSON from client: {e}")
+                inbox.put_nowait(ws_loads(message))
+            except WS_DECODE_ERRORS as e:
+                logger.error(f"❌ Invalid message from client: {e}")
             except Exception as e:
                 logger.error(f"❌ Error handling message: {e}")
     except websockets.exceptions.ConnectionClosed:
         logger.warning(f"❌ Client disconnected: {websocket.remote_address}")
     finally:
+        # Stop the drain task once the queued messages are handled
+        inbox.put_nowait(None)
         connected_clients.discard(websocket)
+        msgpack_clients.discard(websocket)
         logger.info(f"Remaining clients: {len(connected_clients)}")
 
-# ==============================
-# 📩 Handle Messages from Extension
-# ==============================
-async def handle_client_message(data: dict, websocket):
-    """Handle incoming messages from the Chrome extension"""
-    msg_type = data.get("type")
-
-    if msg_type == "hello":
-        logger.info(f"👋 Extension connected at {data.get('timestamp')}")
-        await websocket.send(json.dumps({"type": "welcome", "message": "Bot is ready"}))
-
-        # Send configuration to extension
+async def drain_client_inbox(inbox: asyncio.Queue, websocket):
+    """Dispatch messages queued by one standalone connection, in arrival order; None ends the loop"""
+    while (data := await inbox.get()) is not None:
         try:
-            config = config_manager.load_config()
-            await websocket.send(json.dumps({
-                "type": "config_update",
-                "config": {
-                    "monitoring_time": config.get("slot_monitoring_time", 30),
-                    "monitoring_interval": config.get("monitoring_interval", 50)
-                }
-            }))
-            logger.info("📤 Sent configuration to extension")
+            await handle_client_message(data, websocket)
         except Exception as e:
-            logger.error(f"❌ Failed to send configuration to extension: {e}")
-
-        # Notify web clients
-        broadcast_to_web({"type": "log", "message": "✅ Chrome extension connected", "level": "success"})
+            logger.error(f"❌ Error handling message: {e}")
 
-    elif msg_type == "ack":
-        # Acknowledgment that URL was stored
-        status = data.get("status")
-        url = data.get("url")
-        if status == "stored":
-            logger.info(f"✅ Extension confirmed URL stored: {url}")
-            broadcast_to_web({"type": "log", "message": f"✅ Extension confirmed URL stored", "level": "success"})
-        elif status == "error":
-            logger.error(f"❌ Extension failed to store URL: {data.get('error')}")
-            broadcast_to_web({"type": "log", "message": f"❌ Extension failed to store URL: {data.get('error')}", "level": "error"})
+# ==============================
+# 📩 Handle Messages from Extension
+# ==============================
+async def _on_hello(data: dict, websocket):
+    """Greet a newly connected extension and send it the monitoring config"""
+    logger.info(f"👋 Extension connected at {data.get('timestamp')}")
+    if wants_msgpack(data):
+        msgpack_clients.add(websocket)
+    await websocket.send(extension_welcome_frame(data))
+
+    # Send configuration to extension
+    try:
+        config = get_config_manager().load_config()
+        await websocket.send(ws_dumps({
+            "type": "config_update",
+            "config": {
+                "monitoring_time": config.get("slot_monitoring_time", 30),
+                "monitoring_interval": config.get("monitoring_interval", 50)
+            }
+        }))
+        logger.info("📤 Sent configuration to extension")
+    except Exception as e:
+        logger.error(f"❌ Failed to send configuration to extension: {e}")
 
-    elif msg_type == "session_status":
-        # Session check result
-        status = data.get("status")
-        url = data.get("url")
+    # Notify web clients
+    broadcast_log_to_web("✅ Chrome extension connected", "success")
+
+async def _on_ack(data: dict, websocket):
+    """Acknowledgment that URL was stored"""
+    status = data.get("status")
+    url = data.get("url")
+    if status == "stored":
+        logger.info(f"✅ Extension confirmed URL stored: {url}")
+        broadcast_log_to_web(f"✅ Extension confirmed URL stored", "success")
+    elif status == "error":
+        logger.error(f"❌ Extension failed to store URL: {data.get('error')}")
+        broadcast_log_to_web(f"❌ Extension failed to store URL: {data.get('error')}", "error")
+
+async def _on_session_status(data: dict, websocket):
+    """Session check result"""
+    status = data.get("status")
+    url = data.get("url")
+    username = data.get("username")
+    if status == "already_logged_in":
+        logger.info(f"✅ User already logged in as '{username}' on {url}")
+        broadcast_log_to_web(f"✅ Already logged in as '{username}'", "success")
+    elif status == "not_logged_in":
+        logger.info(f"🔓 User not logged in on {url}, will attempt auto-login")
+        broadcast_log_to_web("🔓 Not logged in, attempting auto-login...")
+
+async def _on_login_result(data: dict, websocket):
+    """Login attempt result"""
+    status = data.get("status")
+    url = data.get("url")
+    if status == "success":
         username = data.get("username")
-        if status == "already_logged_in":
-            logger.info(f"✅ User already logged in as '{username}' on {url}")
-            broadcast_to_web({"type": "log", "message": f"✅ Already logged in as '{username}'", "level": "success"})
-        elif status == "not_logged_in":
-            logger.info(f"🔓 User not logged in on {url}, will attempt auto-login")
-            broadcast_to_web({"type": "log", "message": "🔓 Not logged in, attempting auto-login...", "level": "info"})
-
-    elif msg_type == "login_result":
-        # Login attempt result
-        status = data.get("status")
-        url = data.get("url")
-        if status == "success":
+        logger.info(f"🎉 LOGIN SUCCESS: Logged in as '{username}' on {url}")
+        broadcast_log_to_web(f"🎉 Login successful as '{username}'", "success")
+    elif status == "failed":
+        error = data.get("error")
+        logger.error(f"❌ LOGIN FAILED on {url}: {error}")
+        broadcast_log_to_web(f"❌ Login failed: {error}", "error")
+
+async def _on_pre_login_result(data: dict, websocket):
+    """Pre-login trigger result (2 min before scheduled time)"""
+    status = data.get("status")
+    url = data.get("url")
+    if status == "success":
+        if data.get("alreadyLoggedIn"):
             username = data.get("username")
-            logger.info(f"🎉 LOGIN SUCCESS: Logged in as '{username}' on {url}")
-            broadcast_to_web({"type": "log", "message": f"🎉 Login successful as '{username}'", "level": "success"})
-        elif status == "failed":
-            error = data.get("error")
-            logger.error(f"❌ LOGIN FAILED on {url}: {error}")
-            broadcast_to_web({"type": "log", "message": f"❌ Login failed: {error}", "level": "error"})
+            logger.info(f"✅ Pre-login check: Already logged in as '{username}' on {url}")
+            broadcast_log_to_web(f"✅ Pre-login: Already logged in as '{username}'", "success")
+        elif data.get("loggedIn"):
+            username = data.get("username")
+            logger.info(f"🎉 Pre-login: Successfully logged in as '{username}' on {url}")
+            broadcast_log_to_web(f"🎉 Pre-login successful as '{username}'", "success")
+        elif data.get("noLogin"):
+            logger.info(f"ℹ️ Pre-login check completed (no auto-login configured)")
+            broadcast_log_to_web("ℹ️ Pre-login check completed")
+        logger.info(f"🗑️ Pre-login tab closed. Final tab will open in 1 minute.")
+        broadcast_log_to_web("🗑️ Pre-login tab closed. Final tab opens in 1 minute.")
+    elif status == "error":
+        error = data.get("error")
+        logger.error(f"❌ Pre-login failed on {url}: {error}")
+        broadcast_log_to_web(f"❌ Pre-login failed: {error}", "error")
+
+def _report_slot_results(slots: list, total_slots: int):
+    """Log a multi-slot result and send the web UI its per-slot lines in one batch frame"""
+    logger.info(f"📂 Opening {total_slots} tabs for slots: {', '.join([s['slot'] for s in slots])}")
+    # Skip building the web lines when no dashboard is connected
+    notify = bool(web_clients)
+    messages = [{"type": "log", "message": f"📂 Opening {total_slots} tabs for time slots", "level": "info"}]
+
+    for slot_info in slots:
+        slot = slot_info.get("slot")
+        if slot_info.get("status") == "loaded":
+            logger.info(f"✅ Slot \"{slot}\" loaded in tab {slot_info.get('tabId')}")
+            if notify:
+                messages.append({"type": "log", "message": f"✅ Slot \"{slot}\" loaded successfully", "level": "success"})
+        else:
+            error = slot_info.get("error", "Unknown error")
+            logger.error(f"❌ Slot \"{slot}\" failed: {error}")
+            if notify:
+                messages.append({"type": "log", "message": f"❌ Slot \"{slot}\" failed: {error}", "level": "error"})
+
+    if notify:
+        broadcast_web_batch(messages)
+
+async def _on_result(data: dict, websocket):
+    """Result of opening the URL (single or multi-slot)"""
+    status = data.get("status")
+    url = data.get("url")
+    multi_slot = data.get("multiSlot", False)
+
+    if multi_slot:
+        # Multi-slot result
+        slots = data.get("slots", [])
+        total_slots = data.get("totalSlots", 0)
+        success_count = data.get("successCount", 0)
+        failed_count = data.get("failedCount", 0)
+
+        if status in ("success", "partial_success"):
+            _report_slot_results(slots, total_slots)
+            if status == "success":
+                logger.info(f"🎉 SUCCESS: All {total_slots} tabs opened successfully")
+                broadcast_log_to_web(f"🎉 All {total_slots} tabs opened successfully!", "success")
+            else:
+                logger.warning(f"⚠️ PARTIAL SUCCESS: {success_count} of {total_slots} tabs opened successfully")
+                broadcast_log_to_web(f"⚠️ Partial success: {success_count}/{total_slots} tabs opened", "warning")
 
-    elif msg_type == "pre_login_result":
-        # Pre-login trigger result (2 min before scheduled time)
-        status = data.get("status")
-        url = data.get("url")
+        elif status == "error":
+            error = data.get("error")
+            logger.error(f"❌ FAILED to open multi-slot tabs: {error}")
+            broadcast_log_to_web(f"❌ Failed to open tabs: {error}", "error")
+    else:
+        # Single tab result
         if status == "success":
-            if data.get("alreadyLoggedIn"):
-                username = data.get("username")
-                logger.info(f"✅ Pre-login check: Already logged in as '{username}' on {url}")
-                broadcast_to_web({"type": "log", "message": f"✅ Pre-login: Already logged in as '{username}'", "level": "success"})
-            elif data.get("loggedIn"):
-                username = data.get("username")
-                logger.info(f"🎉 Pre-login: Successfully logged in as '{username}' on {url}")
-                broadcast_to_web({"type": "log", "message": f"🎉 Pre-login successful as '{username}'", "level": "success"})
-            elif data.get("noLogin"):
-                logger.info(f"ℹ️ Pre-login check completed (no auto-login configured)")
-                broadcast_to_web({"type": "log", "message": "ℹ️ Pre-login check completed", "level": "info"})
-            logger.info(f"🗑️ Pre-login tab closed. Final tab will open in 1 minute.")
-            broadcast_to_web({"type": "log", "message": "🗑️ Pre-login tab closed. Final tab opens in 1 minute.", "level": "info"})
+            tab_id = data.get("tabId")
+            logger.info(f"🎉 SUCCESS: URL opened in tab {tab_id}: {url}")
+            broadcast_log_to_web(f"🎉 URL opened successfully in tab {tab_id}", "success")
+        elif status == "warning":
+            tab_id = data.get("tabId")
+            message = data.get("message")
+            logger.warning(f"⚠️ WARNING: {message} (tab {tab_id})")
+            broadcast_log_to_web(f"⚠️ {message}", "warning")
         elif status == "error":
             error = data.get("error")
-            logger.error(f"❌ Pre-login failed on {url}: {error}")
-            broadcast_to_web({"type": "log", "message": f"❌ Pre-login failed: {error}", "level": "error"})
+            logger.error(f"❌ FAILED to open URL: {url} - Error: {error}")
+            broadcast_log_to_web(f"❌ Failed to open URL: {error}", "error")
+
+# (timings key, label) for the per-step lines of a booking_result timing breakdown
+_TIMING_FIELDS = (
+    ("dateSelectionDuration", "Date Selection"),
+    ("quantitySelectionDuration", "Quantity Selection"),
+    ("slotMonitoringDuration", "Slot Monitoring"),
+    ("ticketRequestDuration", "Ticket Request"),
+)
 
-    elif msg_type == "result":
-        # Result of opening the URL (single or multi-slot)
-        status = data.get("status")
-        url = data.get("url")
-        multi_slot = data.get("multiSlot", False)
+def _log_timing_breakdown(timings: dict):
+    """Log each non-zero step duration from a booking_result timings dict"""
+    for key, label in _TIMING_FIELDS:
+        if value := timings.get(key):
+            logger.info("      %s: %sms (%.2fs)", label, value, value * 0.001)
+
+async def _on_booking_result(data: dict, websocket):
+    """Automated booking result from extension"""
+    slot = data.get("slot")
+    tab_id = data.get("tabId")
+    status = data.get("status")
+    steps = data.get("steps", {})
+    timings = data.get("timings", {})
+    error = data.get("error")
+    requested_quantity = data.get("requestedQuantity", data.get("quantity", 1))  # Fallback for backward compatibility
+    available_quantity = data.get("availableQuantity")
+    actual_quantity = data.get("actualQuantity", requested_quantity)
+
+    # Find the booking ID for this result (match by URL and date)
+    url = data.get("url")
+    booking = booking_storage.find_booking_by_url(url)
+    booking_id = booking.get("id") if booking else None
+
+    if status == "success":
+        # Build quantity message
+        if available_quantity is not None and actual_quantity != requested_quantity:
+            quantity_msg = f"({actual_quantity} ticket(s) - requested {requested_quantity}, but only {available_quantity} available)"
+            quantity_info = f"📊 Quantity adjusted: Booked {actual_quantity} tickets (requested {requested_quantity}, available {available_quantity})"
+        else:
+            quantity_msg = f"({actual_quantity} ticket(s))"
+            quantity_info = None
 
-        if multi_slot:
-            # Multi-slot result
-            slots = data.get("slots", [])
-            total_slots = data.get("totalSlots", 0)
-            success_count = data.get("successCount", 0)
-            failed_count = data.get("failedCount", 0)
+        logger.info("🎉 BOOKING SUCCESS: Slot \"%s\" %s - Tab %s", slot, quantity_msg, tab_id)
 
-            if status == "success":
-                logger.info(f"📂 Opening {total_slots} tabs for slots: {', '.join([s['slot'] for s in slots])}")
-                broadcast_to_web({"type": "log", "message": f"📂 Opening {total_slots} tabs for time slots", "level": "info"})
-                for slot_info in slots:
-                    slot = slot_info.get("slot")
-                    tab_id = slot_info.get("tabId")
-                    slot_status = slot_info.get("status")
-                    if slot_status == "loaded":
-                        logger.info(f"✅ Slot \"{slot}\" loaded in tab {tab_id}")
-                        broadcast_to_web({"type": "log", "message": f"✅ Slot \"{slot}\" loaded successfully", "level": "success"})
-                    else:
-                        error = slot_info.get("error", "Unknown error")
-                        logger.error(f"❌ Slot \"{slot}\" failed: {error}")
-                        broadcast_to_web({"type": "log", "message": f"❌ Slot \"{slot}\" failed: {error}", "level": "error"})
-                logger.info(f"🎉 SUCCESS: All {total_slots} tabs opened successfully")
-                broadcast_to_web({"type": "log", "message": f"🎉 All {total_slots} tabs opened successfully!", "level": "success"})
-
-            elif status == "partial_success":
-                logger.info(f"📂 Opening {total_slots} tabs for slots: {', '.join([s['slot'] for s in slots])}")
-                broadcast_to_web({"type": "log", "message": f"📂 Opening {total_slots} tabs for time slots", "level": "info"})
-                for slot_info in slots:
-                    slot = slot_info.get("slot")
-                    tab_id = slot_info.get("tabId")
-                    slot_status = slot_info.get("status")
-                    if slot_status == "loaded":
-                        logger.info(f"✅ Slot \"{slot}\" loaded in tab {tab_id}")
-                        broadcast_to_web({"type": "log", "message": f"✅ Slot \"{slot}\" loaded successfully", "level": "success"})
-                    else:
-                        error = slot_info.get("error", "Unknown error")
-                        logger.error(f"❌ Slot \"{slot}\" failed: {error}")
-                        broadcast_to_web({"type": "log", "message": f"❌ Slot \"{slot}\" failed: {error}", "level": "error"})
-                logger.warning(f"⚠️ PARTIAL SUCCESS: {success_count} of {total_slots} tabs opened successfully")
-                broadcast_to_web({"type": "log", "message": f"⚠️ Partial success: {success_count}/{total_slots} tabs opened", "level": "warning"})
+        # Send event-based log to frontend
+        if booking_id:
+            broadcast_event_log_to_web(booking_id, f"🎉 BOOKING SUCCESS: Slot \"{slot}\" {quantity_msg}", "success", "booking_result")
 
-            elif status == "error":
-                error = data.get("error")
-                logger.error(f"❌ FAILED to open multi-slot tabs: {error}")
-                broadcast_to_web({"type": "log", "message": f"❌ Failed to open tabs: {error}", "level": "error"})
-        else:
-            # Single tab result
-            if status == "success":
-                tab_id = data.get("tabId")
-                logger.info(f"🎉 SUCCESS: URL opened in tab {tab_id}: {url}")
-                broadcast_to_web({"type": "log", "message": f"🎉 URL opened successfully in tab {tab_id}", "level": "success"})
-            elif status == "warning":
-                tab_id = data.get("tabId")
-                message = data.get("message")
-                logger.warning(f"⚠️ WARNING: {message} (tab {tab_id})")
-                broadcast_to_web({"type": "log", "message": f"⚠️ {message}", "level": "warning"})
-            elif status == "error":
-                error = data.get("error")
-                logger.error(f"❌ FAILED to open URL: {url} - Error: {error}")
-                broadcast_to_web({"type": "log", "message": f"❌ Failed to open URL: {error}", "level": "error"})
-
-    elif msg_type == "booking_result":
-        # Automated booking result from extension
-        slot = data.get("slot")
-        tab_id = data.get("tabId")
-        status = data.get("status")
-        steps = data.get("steps", {})
-        timings = data.get("timings", {})
-        error = data.get("error")
-        requested_quantity = data.get("requestedQuantity", data.get("quantity", 1))  # Fallback for backward compatibility
-        available_quantity = data.get("availableQuantity")
-        actual_quantity = data.get("actualQuantity", requested_quantity)
+            # Update booking status to completed
+            broadcast_to_web({
+                "type": "booking_update",
+                "booking_id": booking_id,
+                "status": "completed",
+                "message": f"✅ Booking completed successfully for slot \"{slot}\""
+            })
 
-        # Find the booking ID for this result (match by URL and date)
-        url = data.get("url")
-        booking_id = None
-        for bid, booking in active_bookings.items():
-            if booking.get("url") == url:
-                booking_id = bid
-                break
+        # Display quantity adjustment info if applicable
+        if quantity_info:
+            logger.info("   %s", quantity_info)
+            if booking_id:
+                broadcast_event_log_to_web(booking_id, quantity_info, "warning", "quantity_adjustment")
 
-        if status == "success":
-            # Build quantity message
-            if available_quantity is not None and actual_quantity != requested_quantity:
-                quantity_msg = f"({actual_quantity} ticket(s) - requested {requested_quantity}, but only {available_quantity} available)"
-                quantity_info = f"📊 Quantity adjusted: Booked {actual_quantity} tickets (requested {requested_quantity}, available {available_quantity})"
-            else:
-                quantity_msg = f"({actual_quantity} ticket(s))"
-                quantity_info = None
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("   ✅ Date selection: %s", steps.get('dateSelection', 'unknown'))
+            logger.info("   ✅ Quantity selection: %s", steps.get('quantitySelection', 'unknown'))
+            logger.info("   ✅ Slot monitoring: %s", steps.get('slotMonitoring', 'unknown'))
+            logger.info("   ✅ Ticket request: %s", steps.get('ticketRequest', 'unknown'))
 
-            logger.info(f"🎉 BOOKING SUCCESS: Slot \"{slot}\" {quantity_msg} - Tab {tab_id}")
+        # Send step details to frontend as one batched event log
+        if booking_id:
+            broadcast_to_web({
+                "type": "booking_event_log_batch",
+                "booking_id": booking_id,
+                "entries": [
+                    {"message": f"✅ Date selection: {steps.get('dateSelection', 'unknown')}", "level": "info", "event_type": "step_detail"},
+                    {"message": f"✅ Quantity selection: {steps.get('quantitySelection', 'unknown')}", "level": "info", "event_type": "step_detail"},
+                    {"message": f"✅ Slot monitoring: {steps.get('slotMonitoring', 'unknown')}", "level": "info", "event_type": "step_detail"},
+                    {"message": f"✅ Ticket request: {steps.get('ticketRequest', 'unknown')}", "level": "info", "event_type": "step_detail"}
+                ]
+            })
 
-            # Send event-based log to frontend
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"🎉 BOOKING SUCCESS: Slot \"{slot}\" {quantity_msg}",
-                    "level": "success",
-                    "event_type": "booking_result"
-                })
-
-                # Update booking status to completed
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "completed",
-                    "message": f"✅ Booking completed successfully for slot \"{slot}\""
-                })
-
-            # Display quantity adjustment info if applicable
-            if quantity_info:
-                logger.info(f"   {quantity_info}")
-                if booking_id:
-                    broadcast_to_web({
-                        "type": "booking_event_log",
-                        "booking_id": booking_id,
-                        "message": quantity_info,
-                        "level": "warning",
-                        "event_type": "quantity_adjustment"
-                    })
-
-            logger.info(f"   ✅ Date selection: {steps.get('dateSelection', 'unknown')}")
-            logger.info(f"   ✅ Quantity selection: {steps.get('quantitySelection', 'unknown')}")
-            logger.info(f"   ✅ Slot monitoring: {steps.get('slotMonitoring', 'unknown')}")
-            logger.info(f"   ✅ Ticket request: {steps.get('ticketRequest', 'unknown')}")
-
-            # Send step details to frontend
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"✅ Date selection: {steps.get('dateSelection', 'unknown')}",
-                    "level": "info",
-                    "event_type": "step_detail"
-                })
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"✅ Quantity selection: {steps.get('quantitySelection', 'unknown')}",
-                    "level": "info",
-                    "event_type": "step_detail"
-                })
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"✅ Slot monitoring: {steps.get('slotMonitoring', 'unknown')}",
-                    "level": "info",
-                    "event_type": "step_detail"
-                })
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"✅ Ticket request: {steps.get('ticketRequest', 'unknown')}",
-                    "level": "info",
-                    "event_type": "step_detail"
-                })
-
-            # Display timing information
-            if timings:
-                logger.info(f"   ⏱️ TIMING BREAKDOWN:")
-                total_time = timings.get('totalBookingTime', 0)
-                if timings.get('dateSelectionDuration'):
-                    logger.info(f"      Date Selection: {timings['dateSelectionDuration']}ms ({timings['dateSelectionDuration']/1000:.2f}s)")
-                if timings.get('quantitySelectionDuration'):
-                    logger.info(f"      Quantity Selection: {timings['quantitySelectionDuration']}ms ({timings['quantitySelectionDuration']/1000:.2f}s)")
-                if timings.get('slotMonitoringDuration'):
-                    logger.info(f"      Slot Monitoring: {timings['slotMonitoringDuration']}ms ({timings['slotMonitoringDuration']/1000:.2f}s)")
-                if timings.get('ticketRequestDuration'):
-                    logger.info(f"      Ticket Request: {timings['ticketRequestDuration']}ms ({timings['ticketRequestDuration']/1000:.2f}s)")
+        # Display timing information
+        if timings:
+            total_time = timings.get('totalBookingTime', 0)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("   ⏱️ TIMING BREAKDOWN:")
+                _log_timing_breakdown(timings)
                 if total_time:
-                    logger.info(f"      ⏱️ TOTAL BOOKING TIME: {total_time}ms ({total_time/1000:.2f}s)")
-                    if booking_id:
-                        broadcast_to_web({
-                            "type": "booking_event_log",
-                            "booking_id": booking_id,
-                            "message": f"⏱️ Total booking time: {total_time/1000:.2f}s",
-                            "level": "info",
-                            "event_type": "timing"
-                        })
-
-        elif status == "failed":
-            # Build quantity message for failed booking
-            if available_quantity is not None and actual_quantity != requested_quantity:
-                quantity_msg = f"({actual_quantity} ticket(s) - requested {requested_quantity}, but only {available_quantity} available)"
-            else:
-                quantity_msg = f"({actual_quantity} ticket(s))"
+                    logger.info("      ⏱️ TOTAL BOOKING TIME: %sms (%.2fs)", total_time, total_time * 0.001)
+            if total_time and booking_id:
+                broadcast_event_log_to_web(booking_id, f"⏱️ Total booking time: {total_time/1000:.2f}s", "info", "timing")
+
+    elif status == "failed":
+        # Build quantity message for failed booking
+        if available_quantity is not None and actual_quantity != requested_quantity:
+            quantity_msg = f"({actual_quantity} ticket(s) - requested {requested_quantity}, but only {available_quantity} available)"
+        else:
+            quantity_msg = f"({actual_quantity} ticket(s))"
 
-            logger.error(f"❌ BOOKING FAILED: Slot \"{slot}\" {quantity_msg} - Tab {tab_id}")
-            logger.error(f"   Error: {error}")
+        logger.error("❌ BOOKING FAILED: Slot \"%s\" %s - Tab %s", slot, quantity_msg, tab_id)
+        logger.error("   Error: %s", error)
 
-            # Send event-based log to frontend
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"❌ BOOKING FAILED: Slot \"{slot}\" - {error}",
-                    "level": "error",
-                    "event_type": "booking_result"
-                })
-
-                # Update booking status to failed
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "failed",
-                    "message": f"❌ Booking failed for slot \"{slot}\": {error}"
-                })
-
-            logger.info(f"   Date selection: {steps.get('dateSelection', 'unknown')}")
-            logger.info(f"   Quantity selection: {steps.get('quantitySelection', 'unknown')}")
-            logger.info(f"   Slot monitoring: {steps.get('slotMonitoring', 'unknown')}")
-            logger.info(f"   Ticket request: {steps.get('ticketRequest', 'unknown')}")
-
-            # Send step details to frontend
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"Date selection: {steps.get('dateSelection', 'unknown')}",
-                    "level": "info",
-                    "event_type": "step_detail"
-                })
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"Quantity selection: {steps.get('quantitySelection', 'unknown')}",
-                    "level": "info",
-                    "event_type": "step_detail"
-                })
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"Slot monitoring: {steps.get('slotMonitoring', 'unknown')}",
-                    "level": "info",
-                    "event_type": "step_detail"
-                })
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"Ticket request: {steps.get('ticketRequest', 'unknown')}",
-                    "level": "info",
-                    "event_type": "step_detail"
-                })
-
-            # Display timing information even for failed bookings
-            if timings:
-                logger.info(f"   ⏱️ TIMING BREAKDOWN:")
-                if timings.get('dateSelectionDuration'):
-                    logger.info(f"      Date Selection: {timings['dateSelectionDuration']}ms ({timings['dateSelectionDuration']/1000:.2f}s)")
-                if timings.get('quantitySelectionDuration'):
-                    logger.info(f"      Quantity Selection: {timings['quantitySelectionDuration']}ms ({timings['quantitySelectionDuration']/1000:.2f}s)")
-                if timings.get('slotMonitoringDuration'):
-                    logger.info(f"      Slot Monitoring: {timings['slotMonitoringDuration']}ms ({timings['slotMonitoringDuration']/1000:.2f}s)")
-                if timings.get('ticketRequestDuration'):
-                    logger.info(f"      Ticket Request: {timings['ticketRequestDuration']}ms ({timings['ticketRequestDuration']/1000:.2f}s)")
-                if timings.get('totalBookingTime'):
-                    logger.info(f"      ⏱️ TOTAL TIME: {timings['totalBookingTime']}ms ({timings['totalBookingTime']/1000:.2f}s)")
-
-    elif msg_type == "ping":
-        await websocket.send(json.dumps({"type": "pong", "timestamp": datetime.now().timestamp()}))
-
-    elif msg_type == "pong":
-        logger.debug("🏓 Pong received from extension")
+        # Send event-based log to frontend
+        if booking_id:
+            broadcast_event_log_to_web(booking_id, f"❌ BOOKING FAILED: Slot \"{slot}\" - {error}", "error", "booking_result")
 
-    else:
-        logger.warning(f"⚠️ Unknown message type: {msg_type}")
+            # Update booking status to failed
+            broadcast_to_web({
+                "type": "booking_update",
+                "booking_id": booking_id,
+                "status": "failed",
+                "message": f"❌ Booking failed for slot \"{slot}\": {error}"
+            })
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("   Date selection: %s", steps.get('dateSelection', 'unknown'))
+            logger.info("   Quantity selection: %s", steps.get('quantitySelection', 'unknown'))
+            logger.info("   Slot monitoring: %s", steps.get('slotMonitoring', 'unknown'))
+            logger.info("   Ticket request: %s", steps.get('ticketRequest', 'unknown'))
+
+        # Send step details to frontend as one batched event log
+        if booking_id:
+            broadcast_to_web({
+                "type": "booking_event_log_batch",
+                "booking_id": booking_id,
+                "entries": [
+                    {"message": f"Date selection: {steps.get('dateSelection', 'unknown')}", "level": "info", "event_type": "step_detail"},
+                    {"message": f"Quantity selection: {steps.get('quantitySelection', 'unknown')}", "level": "info", "event_type": "step_detail"},
+                    {"message": f"Slot monitoring: {steps.get('slotMonitoring', 'unknown')}", "level": "info", "event_type": "step_detail"},
+                    {"message": f"Ticket request: {steps.get('ticketRequest', 'unknown')}", "level": "info", "event_type": "step_detail"}
+                ]
+            })
+
+        # Display timing information even for failed bookings
+        if timings and logger.isEnabledFor(logging.INFO):
+            logger.info("   ⏱️ TIMING BREAKDOWN:")
+            _log_timing_breakdown(timings)
+            if total_time := timings.get('totalBookingTime'):
+                logger.info("      ⏱️ TOTAL TIME: %sms (%.2fs)", total_time, total_time * 0.001)
+
+async def _on_ping(data: dict, websocket):
+    """Answer an extension keepalive ping"""
+    await websocket.send(ws_dumps({"type": "pong", "timestamp": time.time()}))
+
+async def _on_pong(data: dict, websocket):
+    """Keepalive reply from extension"""
+    logger.debug("🏓 Pong received from extension")
+
+async def _on_unknown(data: dict, websocket):
+    """Log a message type no handler is registered for"""
+    msg_type = data.get("type")
+    logger.warning(f"⚠️ Unknown message type: {msg_type}")
+
+# Extension message type -> handler (standalone WebSocket server)
+_CLIENT_DISPATCH = {
+    "hello": _on_hello,
+    "ack": _on_ack,
+    "session_status": _on_session_status,
+    "login_result": _on_login_result,
+    "pre_login_result": _on_pre_login_result,
+    "result": _on_result,
+    "booking_result": _on_booking_result,
+    "ping": _on_ping,
+    "pong": _on_pong,
+}
+
+async def handle_client_message(data: dict, websocket):
+    """Handle incoming messages from the Chrome extension"""
+    await _CLIENT_DISPATCH.get(data.get("type"), _on_unknown)(data, websocket)
 
 # ==============================
 # 🌍 Broadcast Utility
 # ==============================
+# Clients sent to per batch before broadcast yields back to the event loop
+BROADCAST_BATCH_SIZE = 50
+
+async def _gather_batched(send, clients: list) -> list:
+    """Await send(client) for every client, one batch at a time, yielding between batches"""
+    results = []
+    for start in range(0, len(clients), BROADCAST_BATCH_SIZE):
+        if start:
+            # Let incoming messages and HTTP handlers run during a large fan-out
+            await asyncio.sleep(0)
+        batch = clients[start:start + BROADCAST_BATCH_SIZE]
+        results += await asyncio.gather(*(send(ws) for ws in batch), return_exceptions=True)
+    return results
+
 async def broadcast(message: dict):
     """Send message to all connected extension clients (both standalone and Flask-Sock)"""
-    msg = json.dumps(message)
+    msg = ws_dumps(message)
+    # Binary MessagePack frame for extensions that negotiated it, encoded once as well
+    packed = _MSGPACK_ENCODER.encode(message) if msgpack_clients else None
     sent_count = 0
 
     # Send to standalone WebSocket clients (if enabled)
     if connected_clients:
-        results = await asyncio.gather(
-            *(ws.send(msg) for ws in connected_clients),
-            return_exceptions=True
+        # UTF-8 encode once and send as text frames, instead of websockets re-encoding per client
+        frame = msg.encode()
+        results = await _gather_batched(
+            lambda ws: ws.send(packed) if ws in msgpack_clients else ws.send(frame, text=True),
+            list(connected_clients)
         )
         # Log any send failures
         for result in results:
@@ -1264,13 +1638,16 @@ async def broadcast(message: dict):
 
     # Send to Flask-Sock extension clients (production mode)
     if extension_clients:
+        # Only enqueue here; each client's sender thread does the blocking ws.send
         for ws in list(extension_clients):
-            try:
-                ws.send(msg)
-                sent_count += 1
-            except Exception as e:
-                logger.error(f"Failed to send to Flask-Sock extension client: {e}")
-                extension_clients.discard(ws)
+            outbox = _extension_outboxes[ws]
+            if outbox.qsize() >= EXTENSION_SEND_QUEUE_SIZE:
+                # Client isn't keeping up; drop it rather than buffer without bound
+                logger.warning("⚠️ Extension send queue full, disconnecting slow client")
+                drop_slow_client(ws)
+                continue
+            outbox.put(packed if ws in msgpack_clients else msg)
+            sent_count += 1
 
     if sent_count == 0:
         logger.warning("⚠️ No extension clients connected to send message.")
@@ -1280,6 +1657,11 @@ async def broadcast(message: dict):
 # ==============================
 # ⏰ Schedule + Trigger Logic
 # ==============================
+async def sleep_until(deadline: float):
+    """Sleep until an absolute event loop time (loop.time() is monotonic)"""
+    loop = asyncio.get_running_loop()
+    await asyncio.sleep(max(0, deadline - loop.time()))
+
 async def schedule_and_trigger(target_time: datetime, url: str, email: str = None, password: str = None,
                                time_slots: list = None, booking_date: str = None, slots_with_quantities: list = None,
                                booking_id: str = None):
@@ -1293,6 +1675,9 @@ async def schedule_and_trigger(target_time: datetime, url: str, email: str = Non
     If time_slots is provided, multiple tabs will be opened (one per slot)
     If slots_with_quantities is provided, automated booking will be performed in each tab
     """
+    # Tags every log line of this booking, including the timer and stage tasks started from here
+    current_booking_id.set(booking_id)
+
     now = datetime.now(LOCAL_TZ)
     wait_seconds = (target_time - now).total_seconds()
 
@@ -1301,46 +1686,52 @@ async def schedule_and_trigger(target_time: datetime, url: str, email: str = Non
         target_time += timedelta(days=1)
         wait_seconds = (target_time - now).total_seconds()
 
+    # Absolute monotonic deadline for T-0; every stage sleeps until an offset from it so waits don't drift
+    deadline = asyncio.get_running_loop().time() + wait_seconds
+
     # Validate URL format
     if not url.startswith(('http://', 'https://')):
-        logger.warning(f"⚠️ URL doesn't start with http:// or https://, adding https://")
+        logger.warning("⚠️ URL doesn't start with http:// or https://, adding https://")
         url = 'https://' + url
 
+    # One isoformat() feeds both the store_url payload and the log lines ("YYYY-MM-DD HH:MM:SS")
+    scheduled_iso = target_time.isoformat()
+    target_str = scheduled_iso[:19].replace("T", " ")
+
     # Log multi-slot info
     if time_slots and len(time_slots) > 0:
-        slots_str = ", ".join(time_slots)
-        logger.info(f"📋 Multi-slot booking: {len(time_slots)} time slots: {slots_str}")
+        logger.info("📋 Multi-slot booking: %d time slots: %s", len(time_slots), ", ".join(time_slots))
 
     # Log automated booking info
     if booking_date and slots_with_quantities:
-        logger.info(f"🤖 Automated booking enabled for date: {booking_date}")
+        logger.info("🤖 Automated booking enabled for date: %s", booking_date)
         for slot in slots_with_quantities:
-            logger.info(f"   - {slot['time']}: {slot['quantity']} ticket(s)")
+            logger.info("   - %s: %s ticket(s)", slot['time'], slot['quantity'])
 
     # Security warning if credentials are provided
     if email and password:
         logger.warning("⚠️ SECURITY WARNING: Credentials will be transmitted via WebSocket and stored temporarily.")
-        logger.info(f"🔐 Login enabled for: {email}")
+        logger.info("🔐 Login enabled for: %s", email)
         if time_slots and len(time_slots) > 0:
-            logger.info(f"⏳ Scheduled multi-slot trigger with auto-login at {target_time.strftime('%Y-%m-%d %H:%M:%S')} "
-                        f"(in {int(wait_seconds)}s) for URL: {url}")
+            logger.info("⏳ Scheduled multi-slot trigger with auto-login at %s (in %ds) for URL: %s",
+                        target_str, wait_seconds, url)
         else:
-            logger.info(f"⏳ Scheduled trigger with auto-login at {target_time.strftime('%Y-%m-%d %H:%M:%S')} "
-                        f"(in {int(wait_seconds)}s) for URL: {url}")
-        logger.info(f"📅 Timeline: Login check at 2min before, Final tab(s) at 1min before")
+            logger.info("⏳ Scheduled trigger with auto-login at %s (in %ds) for URL: %s",
+                        target_str, wait_seconds, url)
+        logger.info("📅 Timeline: Login check at 2min before, Final tab(s) at 1min before")
     else:
         if time_slots and len(time_slots) > 0:
-            logger.info(f"⏳ Scheduled multi-slot trigger at {target_time.strftime('%Y-%m-%d %H:%M:%S')} "
-                        f"(in {int(wait_seconds)}s) for URL: {url}")
+            logger.info("⏳ Scheduled multi-slot trigger at %s (in %ds) for URL: %s",
+                        target_str, wait_seconds, url)
         else:
-            logger.info(f"⏳ Scheduled trigger at {target_time.strftime('%Y-%m-%d %H:%M:%S')} "
-                        f"(in {int(wait_seconds)}s) for URL: {url}")
+            logger.info("⏳ Scheduled trigger at %s (in %ds) for URL: %s",
+                        target_str, wait_seconds, url)
 
     # Send URL and credentials to extension for storage
     message = {
         "type": "store_url",
         "url": url,
-        "scheduled_time": target_time.isoformat(),
+        "scheduled_time": scheduled_iso,
         "booking_id": booking_id  # Add booking_id for unique identification
     }
 
@@ -1362,181 +1753,145 @@ async def schedule_and_trigger(target_time: datetime, url: str, email: str = Non
         message["auto_login"] = False
 
     await broadcast(message)
-    logger.info(f"📦 Sent 'store_url' to extension(s) for booking {booking_id}.")
+    logger.info("📦 Sent 'store_url' to extension(s).")
+
+    # Notify web clients (display only, so skip building the text when nobody is watching)
+    if booking_id and web_clients:
+        broadcast_log_to_web(f"📦 Booking {booking_id} parameters sent to extension")
+
+    # Stages as (loop time, what it waits for, action), in order
+    login_stage = email and password and wait_seconds > 120  # Only if more than 2 minutes away
+    early_tabs = login_stage or (slots_with_quantities and wait_seconds > 60)
+    stages = []
+    if login_stage:
+        # Login check and auto-login (2 minutes before)
+        stages.append((deadline - 120, "login check (2 min before scheduled time)",
+                       partial(_fire_pre_login, url, booking_id)))
+    if early_tabs:
+        # Final tab opening (1 minute before), so the page is loaded by T-0
+        stages.append((deadline - 60, "tab opening (1 min before scheduled time)",
+                       partial(_fire_trigger, url, time_slots, booking_id)))
+    else:
+        # No automated booking or less than 60 seconds away - use immediate trigger
+        stages.append((deadline, "trigger time", partial(_fire_trigger, url, time_slots, booking_id)))
+    if slots_with_quantities:
+        # Execute booking at exact trigger time (T-0)
+        execute_message = {
+            "type": "execute_booking",
+            "booking_id": booking_id,
+            "booking_date": booking_date,
+            "slots_with_quantities": slots_with_quantities
+        }
+        stages.append((deadline, "exact trigger time (T-0) for date selection", partial(_fire_execute, execute_message)))
+    elif login_stage:
+        logger.info("⚠️ No automated booking configured, no execute_booking will be sent.")
+
+    # The long wait until the first stage is a loop timer rather than a suspended coroutine
+    first_stage, label, _ = stages[0]
+    if wait_seconds > 0:
+        logger.info("⏰ Waiting %ds until %s...", first_stage - asyncio.get_running_loop().time(), label)
+
+    key = booking_id or uuid.uuid4().hex
+    pending_tasks[key] = asyncio.get_running_loop().call_at(first_stage, _start_stages, key, stages)
+
+def _start_stages(key: str, stages: list):
+    """Timer callback: run the trigger stages, tracked under the same key so they stay cancellable"""
+    task = asyncio.create_task(_run_stages(stages))
+    pending_tasks[key] = task
+
+    def _done(t):
+        if pending_tasks.get(key) is t:
+            del pending_tasks[key]
+    task.add_done_callback(_done)
+
+async def _run_stages(stages: list):
+    """Run each stage's action at its deadline"""
+    loop = asyncio.get_running_loop()
+    for i, (when, label, action) in enumerate(stages):
+        if i and when > loop.time():
+            logger.info("⏰ Waiting %ds until %s...", when - loop.time(), label)
+        await sleep_until(when)
+        await action()
+
+async def _fire_pre_login(url: str, booking_id: str):
+    """Have the extension check the login (and log in if needed) ahead of the booking"""
+    logger.info("🚀 Triggering login check — sending 'pre_login_trigger' to extension(s).")
+    await broadcast({"type": "pre_login_trigger", "url": url, "booking_id": booking_id})
 
     # Notify web clients
     if booking_id:
-        broadcast_to_web({
-            "type": "log",
-            "message": f"📦 Booking {booking_id} parameters sent to extension",
-            "level": "info"
-        })
+        broadcast_web_batch(_stage_update_messages(
+            booking_id, "login_check", "🔐 Performing login check...",
+            "🔐 Performing login check (2 minutes before booking time)...", "login_check"
+        ))
+
+async def _fire_trigger(url: str, time_slots: list, booking_id: str):
+    """Open the booking tab(s) in the extension and mark the booking running"""
+    tab_count = len(time_slots) if time_slots else 1
+    message = {"type": "trigger", "url": url, "booking_id": booking_id}
+    if time_slots:
+        message["time_slots"] = time_slots
 
-    # Two-stage trigger for auto-login
-    if email and password and wait_seconds > 120:  # Only if more than 2 minutes away
-        # Stage 1: Login check and auto-login (2 minutes before)
-        pre_login_wait = wait_seconds - 120  # Wait until 2 minutes before
-        logger.info(f"⏰ Stage 1: Waiting {int(pre_login_wait)}s until login check (2 min before scheduled time)...")
-        await asyncio.sleep(pre_login_wait)
+    logger.info("🚀 Opening %d tab(s) — sending 'trigger' to extension(s).", tab_count)
+    await broadcast(message)
 
-        logger.info(f"🚀 Stage 1: Triggering login check for booking {booking_id} — sending 'pre_login_trigger' to extension(s).")
-        await broadcast({"type": "pre_login_trigger", "url": url, "booking_id": booking_id})
+    # Notify web clients
+    if booking_id:
+        opening = f"🚀 Opening {tab_count} tab(s) for booking..."
+        broadcast_web_batch(_stage_update_messages(booking_id, "running", opening, opening, "booking_start"))
 
-        # Notify web clients
-        if booking_id:
-            broadcast_to_web({
-                "type": "booking_update",
-                "booking_id": booking_id,
-                "status": "login_check",
-                "message": "🔐 Performing login check..."
-            })
-            broadcast_to_web({
-                "type": "booking_event_log",
-                "booking_id": booking_id,
-                "message": "🔐 Performing login check (2 minutes before booking time)...",
-                "level": "info",
-                "event_type": "login_check"
-            })
+async def _fire_execute(execute_message: dict):
+    """Send execute_booking to the extension at T-0"""
+    booking_id = execute_message["booking_id"]
+    slot_count = len(execute_message["slots_with_quantities"])
 
-        # Stage 2: Final tab opening (1 minute before)
-        logger.info("⏰ Stage 2: Waiting 60s until final tab opening (1 min before scheduled time)...")
-        await asyncio.sleep(60)
+    logger.info("🎯 TRIGGER TIME (T-0) - Sending 'execute_booking' for %d slots to extension(s).", slot_count)
+    await broadcast(execute_message)
 
-        if time_slots and len(time_slots) > 0:
-            logger.info(f"🚀 Stage 2: Opening final tabs for {len(time_slots)} time slots for booking {booking_id} — sending 'trigger' to extension(s).")
-            await broadcast({"type": "trigger", "url": url, "time_slots": time_slots, "booking_id": booking_id})
-        else:
-            logger.info(f"🚀 Stage 2: Opening final tab for booking {booking_id} — sending 'trigger' to extension(s).")
-            await broadcast({"type": "trigger", "url": url, "booking_id": booking_id})
+    # Notify web clients
+    if booking_id:
+        broadcast_event_log_to_web(booking_id, f"🎯 TRIGGER TIME (T-0): Executing booking for {slot_count} slot(s)...", "info", "execute_booking")
 
-        # Notify web clients
-        if booking_id:
-            broadcast_to_web({
-                "type": "booking_update",
-                "booking_id": booking_id,
-                "status": "running",
-                "message": f"🚀 Opening {len(time_slots) if time_slots else 1} tab(s) for booking..."
-            })
-            broadcast_to_web({
-                "type": "booking_event_log",
-                "booking_id": booking_id,
-                "message": f"🚀 Opening {len(time_slots) if time_slots else 1} tab(s) for booking...",
-                "level": "info",
-                "event_type": "booking_start"
-            })
+# ==============================
+# 🕓 Input Parser
+# ==============================
+BOOKING_DATE_FORMAT = "%Y-%m-%d"
+
+# <time> <URL> [<email> <password> [[<booking_date>] <json>]]; the JSON tail is kept whole, spaces included
+_INPUT_LINE_RE = re.compile(
+    r'(?P<time>\S+)\s+(?P<url>\S+)'
+    r'(?:\s+(?P<email>\S+)\s+(?P<password>\S+)'
+    r'(?:\s+(?:(?P<date>[^\s\[{]\S*)\s+)?(?P<json>[\[{].*))?)?',
+    re.DOTALL
+)
 
-        # Stage 3: Execute booking at exact trigger time (T-0)
-        # Wait the remaining 60 seconds until the scheduled time
-        logger.info("⏰ Stage 3: Waiting 60s until exact trigger time (T-0) for date selection...")
-        await asyncio.sleep(60)
+@lru_cache(maxsize=64)
+def _validate_booking_date(booking_date: str):
+    """Raise ValueError unless booking_date is YYYY-MM-DD; valid dates are remembered"""
+    datetime.strptime(booking_date, BOOKING_DATE_FORMAT)
 
-        # Send execute_booking message with booking parameters
-        if slots_with_quantities and len(slots_with_quantities) > 0:
-            logger.info(f"🎯 Stage 3: TRIGGER TIME (T-0) - Sending 'execute_booking' for {len(slots_with_quantities)} slots to extension(s).")
-            execute_message = {
-                "type": "execute_booking",
-                "booking_id": booking_id,
-                "booking_date": booking_date,
-                "slots_with_quantities": slots_with_quantities
-            }
-            await broadcast(execute_message)
+# CLI "HH:MM" (24-hour); the ranges are checked by the pattern itself
+_CLI_TIME_RE = re.compile(r'([01]?\d|2[0-3]):([0-5]?\d)')
 
-            # Notify web clients
-            broadcast_to_web({
-                "type": "booking_event_log",
-                "booking_id": booking_id,
-                "message": f"🎯 TRIGGER TIME (T-0): Executing booking for {len(slots_with_quantities)} slot(s)...",
-                "level": "info",
-                "event_type": "execute_booking"
-            })
-        else:
-            logger.info(f"⚠️ Stage 3: No automated booking configured for booking {booking_id}, skipping execute_booking message.")
+if msgspec is not None:
+    class _Slot(msgspec.Struct):
+        """One CLI booking slot, e.g. {"time": "8:15 AM", "quantity": 2}"""
+        time: str
+        quantity: Annotated[int, msgspec.Meta(ge=1)]
 
-    else:
-        # No auto-login or less than 2 minutes away - use single trigger
-        # For automated bookings, we need to open tabs 1 minute before and execute at T-0
-        if slots_with_quantities and len(slots_with_quantities) > 0 and wait_seconds > 60:
-            # Wait until 1 minute before
-            pre_trigger_wait = wait_seconds - 60
-            logger.info(f"⏰ Waiting {int(pre_trigger_wait)}s until tab opening (1 min before scheduled time)...")
-            await asyncio.sleep(pre_trigger_wait)
-
-            # Open tabs (1 minute before)
-            if time_slots and len(time_slots) > 0:
-                logger.info(f"🚀 Opening tabs for {len(time_slots)} slots for booking {booking_id} — sending 'trigger' to extension(s).")
-                await broadcast({"type": "trigger", "url": url, "time_slots": time_slots, "booking_id": booking_id})
-            else:
-                logger.info(f"🚀 Opening tab for booking {booking_id} — sending 'trigger' to extension(s).")
-                await broadcast({"type": "trigger", "url": url, "booking_id": booking_id})
-
-            # Notify web clients
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_update",
-                    "booking_id": booking_id,
-                    "status": "running",
-                    "message": f"🚀 Opening {len(time_slots) if time_slots else 1} tab(s) for booking..."
-                })
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"🚀 Opening {len(time_slots) if time_slots else 1} tab(s) for booking...",
-                    "level": "info",
-                    "event_type": "booking_start"
-                })
-
-            # Wait until exact trigger time (T-0)
-            logger.info("⏰ Waiting 60s until exact trigger time (T-0) for date selection...")
-            await asyncio.sleep(60)
-
-            # Send execute_booking message
-            logger.info(f"🎯 TRIGGER TIME (T-0) - Sending 'execute_booking' for {len(slots_with_quantities)} slots to extension(s).")
-            execute_message = {
-                "type": "execute_booking",
-                "booking_id": booking_id,
-                "booking_date": booking_date,
-                "slots_with_quantities": slots_with_quantities
-            }
-            await broadcast(execute_message)
+    _SLOTS_DECODER = msgspec.json.Decoder(list[_Slot])
+else:
+    _SLOTS_DECODER = None
 
-            # Notify web clients
-            if booking_id:
-                broadcast_to_web({
-                    "type": "booking_event_log",
-                    "booking_id": booking_id,
-                    "message": f"🎯 TRIGGER TIME (T-0): Executing booking for {len(slots_with_quantities)} slot(s)...",
-                    "level": "info",
-                    "event_type": "execute_booking"
-                })
-
-        else:
-            # No automated booking or less than 60 seconds away - use immediate trigger
-            if wait_seconds > 0:
-                logger.info(f"⏰ Waiting {int(wait_seconds)} seconds until trigger time...")
-                await asyncio.sleep(wait_seconds)
-
-            # Trigger the URL opening (with login if credentials provided)
-            if time_slots and len(time_slots) > 0:
-                logger.info(f"🚀 Triggering multi-slot event for {len(time_slots)} slots for booking {booking_id} — sending 'trigger' to extension(s).")
-                await broadcast({"type": "trigger", "url": url, "time_slots": time_slots, "booking_id": booking_id})
-            else:
-                logger.info(f"🚀 Triggering event for booking {booking_id} — sending 'trigger' to extension(s).")
-                await broadcast({"type": "trigger", "url": url, "booking_id": booking_id})
-
-            # If automated booking is configured, send execute_booking immediately
-            if slots_with_quantities and len(slots_with_quantities) > 0:
-                logger.info(f"🎯 Sending 'execute_booking' immediately for {len(slots_with_quantities)} slots to extension(s).")
-                execute_message = {
-                    "type": "execute_booking",
-                    "booking_id": booking_id,
-                    "booking_date": booking_date,
-                    "slots_with_quantities": slots_with_quantities
-                }
-                await broadcast(execute_message)
+def _decode_slots_with_quantities(text: str) -> list:
+    """Decode and type-check a slots_with_quantities JSON array with msgspec"""
+    try:
+        return [{"time": slot.time, "quantity": slot.quantity} for slot in _SLOTS_DECODER.decode(text)]
+    except msgspec.ValidationError as e:
+        raise ValueError(f"❌ Invalid slots_with_quantities: {e}")
+    except msgspec.DecodeError as e:
+        raise ValueError(f"❌ Invalid JSON format for slots_with_quantities: {e}")
 
-# ==============================
-# 🕓 Input Parser
-# ==============================
 def parse_input_line(line: str):
     """Parse user input for time, URL, email, password, optional booking_date, and slots_with_quantities
 
@@ -1546,37 +1901,25 @@ def parse_input_line(line: str):
     - <time> <URL> <email> <password> <time_slots_json>
     - <time> <URL> <email> <password> <booking_date> <slots_with_quantities_json>
     """
-    parts = line.strip().split(None, 5)
+    match = _INPUT_LINE_RE.fullmatch(line.strip())
 
     # Check if we have the minimum required parameters (time and URL)
-    if len(parts) < 2:
+    if not match:
         raise ValueError("❌ Invalid input. Format: <time> <URL> [email password] [booking_date slots_with_quantities_json]")
 
-    time_part = parts[0]
-    url = parts[1]
-    email = None
-    password = None
+    time_part, url, email, password, booking_date, json_tail = match.group("time", "url", "email", "password", "date", "json")
     time_slots = None
-    booking_date = None
     slots_with_quantities = None
 
-    # Parse based on number of parameters
-    if len(parts) == 2:
-        # Old format: just time and URL (no login)
+    # Parse based on which parts are present
+    if json_tail is None:
+        # Format: time, URL and optionally email, password (no time slots)
         pass
-    elif len(parts) == 4:
-        # Format: time, URL, email, password (no time slots)
-        email = parts[2]
-        password = parts[3]
-    elif len(parts) == 5:
+    elif booking_date is None:
         # Format: time, URL, email, password, time_slots_json (simple time slots)
-        email = parts[2]
-        password = parts[3]
-        time_slots_str = parts[4]
-
         # Parse time_slots JSON
         try:
-            time_slots = json.loads(time_slots_str)
+            time_slots = ws_loads(json_tail)
 
             # Validate it's a list
             if not isinstance(time_slots, list):
@@ -1597,38 +1940,38 @@ def parse_input_line(line: str):
 
         except json.JSONDecodeError as e:
             raise ValueError(f"❌ Invalid JSON format for time_slots: {e}")
-    elif len(parts) == 6:
+    else:
         # New format: time, URL, email, password, booking_date, slots_with_quantities_json
-        email = parts[2]
-        password = parts[3]
-        booking_date = parts[4].strip('"')  # Remove quotes if present
-        slots_with_quantities_str = parts[5]
+        booking_date = booking_date.strip('"')  # Remove quotes if present
 
         # Validate booking_date format (YYYY-MM-DD)
         try:
-            from datetime import datetime as dt
-            dt.strptime(booking_date, "%Y-%m-%d")
+            _validate_booking_date(booking_date)
         except ValueError:
             raise ValueError(f"❌ Invalid booking_date format. Expected YYYY-MM-DD, got: {booking_date}")
 
         # Parse slots_with_quantities JSON
         try:
-            slots_with_quantities = json.loads(slots_with_quantities_str)
-
-            # Validate it's a list
-            if not isinstance(slots_with_quantities, list):
-                raise ValueError("Slots with quantities must be a JSON array")
-
-            # Validate each item is an object with 'time' and 'quantity' fields
-            for i, slot in enumerate(slots_with_quantities):
-                if not isinstance(slot, dict):
-                    raise ValueError(f"Slot {i+1} must be an object with 'time' and 'quantity' fields")
-                if 'time' not in slot or 'quantity' not in slot:
-                    raise ValueError(f"Slot {i+1} must have 'time' and 'quantity' fields")
-                if not isinstance(slot['time'], str):
-                    raise ValueError(f"Slot {i+1}: 'time' must be a string")
-                if not isinstance(slot['quantity'], int) or slot['quantity'] < 1:
-                    raise ValueError(f"Slot {i+1}: 'quantity' must be a positive integer")
+            if _SLOTS_DECODER is not None:
+                # Parse and validate in one pass
+                slots_with_quantities = _decode_slots_with_quantities(json_tail)
+            else:
+                slots_with_quantities = ws_loads(json_tail)
+
+                # Validate it's a list
+                if not isinstance(slots_with_quantities, list):
+                    raise ValueError("Slots with quantities must be a JSON array")
+
+                # Validate each item is an object with 'time' and 'quantity' fields
+                for i, slot in enumerate(slots_with_quantities):
+                    if not isinstance(slot, dict):
+                        raise ValueError(f"Slot {i+1} must be an object with 'time' and 'quantity' fields")
+                    if 'time' not in slot or 'quantity' not in slot:
+                        raise ValueError(f"Slot {i+1} must have 'time' and 'quantity' fields")
+                    if not isinstance(slot['time'], str):
+                        raise ValueError(f"Slot {i+1}: 'time' must be a string")
+                    if not isinstance(slot['quantity'], int) or slot['quantity'] < 1:
+                        raise ValueError(f"Slot {i+1}: 'quantity' must be a positive integer")
 
             # Warn if too many slots
             if len(slots_with_quantities) > 10:
@@ -1644,8 +1987,6 @@ def parse_input_line(line: str):
 
         except json.JSONDecodeError as e:
             raise ValueError(f"❌ Invalid JSON format for slots_with_quantities: {e}")
-    else:
-        raise ValueError("❌ Invalid input. Format: <time> <URL> [email password] [booking_date slots_with_quantities_json]")
 
     # Parse time
     time_part = time_part.strip().lower()
@@ -1662,15 +2003,12 @@ def parse_input_line(line: str):
         except ValueError as e:
             raise ValueError(f"❌ Invalid time format '+N': {e}")
     else:
-        try:
-            hour, minute = map(int, time_part.split(":"))
-            if not (0 <= hour <= 23 and 0 <= minute <= 59):
-                raise ValueError("❌ Invalid time: hour must be 0-23, minute must be 0-59")
-            target_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-            if target_time <= now:
-                target_time += timedelta(days=1)
-        except ValueError as e:
-            raise ValueError(f"❌ Invalid time format 'HH:MM': {e}")
+        match = _CLI_TIME_RE.fullmatch(time_part)
+        if not match:
+            raise ValueError("❌ Invalid time format 'HH:MM': hour must be 0-23, minute must be 0-59")
+        target_time = now.replace(hour=int(match[1]), minute=int(match[2]), second=0, microsecond=0)
+        if target_time <= now:
+            target_time += timedelta(days=1)
 
     return target_time, url, email, password, time_slots, booking_date, slots_with_quantities
 
@@ -1681,18 +2019,13 @@ async def start_websocket_server():
     """Start the WebSocket server"""
     logger.info(f"🛰️ Starting WebSocket server at ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT} ...")
     try:
-        # Get WebSocket configuration from environment
-        max_size = int(os.getenv("MAX_MESSAGE_SIZE", "1048576"))  # 1MB default
-        ping_interval = int(os.getenv("PING_INTERVAL", "20"))
-        ping_timeout = int(os.getenv("PING_TIMEOUT", "20"))
-
         async with websockets.serve(
             handler,
             WEBSOCKET_HOST,
             WEBSOCKET_PORT,
-            max_size=max_size,
-            ping_interval=ping_interval,
-            ping_timeout=ping_timeout
+            max_size=WEBSOCKET_MAX_SIZE,
+            ping_interval=WEBSOCKET_PING_INTERVAL,
+            ping_timeout=WEBSOCKET_PING_TIMEOUT
         ):
             logger.info(f"✅ WebSocket server ready on {WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
             await asyncio.Future()  # Keeps running forever
@@ -1704,6 +2037,16 @@ async def start_websocket_server():
 # ==============================
 # 🧑‍💻 CLI Task
 # ==============================
+def _stdin_pump(lines: asyncio.Queue, loop):
+    """Read CLI lines on a dedicated thread and hand them to the event loop; None marks EOF"""
+    while True:
+        try:
+            line = input("⚡ > ")
+        except EOFError:
+            loop.call_soon_threadsafe(lines.put_nowait, None)
+            return
+        loop.call_soon_threadsafe(lines.put_nowait, line)
+
 async def cli_task():
     """Handle user input from command line"""
     print("\n" + "="*70)
@@ -1735,9 +2078,17 @@ async def cli_task():
     print("  Only use on trusted networks and devices.")
     print("="*70 + "\n")
 
+    # One long-lived reader thread instead of a to_thread executor hop per line
+    lines = asyncio.Queue()
+    Thread(target=_stdin_pump, args=(lines, asyncio.get_running_loop()), daemon=True, name="stdin").start()
+
     while True:
         try:
-            line = await asyncio.to_thread(input, "⚡ > ")
+            line = await lines.get()
+            if line is None:
+                # No terminal attached (nohup, docker without -t, systemd); keep the servers running
+                logger.info("⌨️ stdin closed, CLI disabled; servers keep running")
+                await asyncio.Future()
             line = line.strip()
 
             if not line:
@@ -1764,6 +2115,8 @@ async def cli_task():
 
                 if total_extensions == 0 and len(web_clients) == 0:
                     logger.info("  No clients connected")
+
+                logger.info(f"⏳ Pending triggers: {len(pending_tasks)}")
                 continue
 
             target_time, url, email, password, time_slots, booking_date, slots_with_quantities = parse_input_line(line)
@@ -1789,6 +2142,14 @@ async def cli_task():
 # ==============================
 # 🏁 Entry Point
 # ==============================
+class _Shutdown(Exception):
+    """Raised inside main()'s TaskGroup to stop the bot once one of its tasks finishes"""
+
+async def _stop_when_done(coro):
+    """Run a top-level task; when it returns, shut the rest of the group down"""
+    await coro
+    raise _Shutdown
+
 async def main():
     """Main entry point - runs WebSocket server, Flask server, and CLI concurrently"""
     global main_event_loop
@@ -1802,44 +2163,30 @@ async def main():
         flask_thread.start()
         logger.info(f"🌐 Flask web server starting on http://{FLASK_HOST}:{FLASK_PORT}")
 
-        tasks = []
-
-        # Only start standalone WebSocket server if enabled (for local development)
-        if ENABLE_STANDALONE_WEBSOCKET and not IS_PRODUCTION:
-            logger.info(f"🔌 Starting standalone WebSocket server on port {WEBSOCKET_PORT}")
-            server_task = asyncio.create_task(start_websocket_server())
-            tasks.append(server_task)
-        else:
-            if IS_PRODUCTION:
-                logger.info("🌐 Production mode: Using Flask-Sock for WebSocket (port 8765 disabled)")
-                logger.info(f"📡 WebSocket available at: wss://your-domain/ws")
-            else:
-                logger.info("💡 Standalone WebSocket disabled. Using Flask-Sock only.")
-                logger.info(f"📡 WebSocket available at: ws://{FLASK_HOST}:{FLASK_PORT}/ws")
-
-        # Start CLI task (only if not in production)
-        if not IS_PRODUCTION:
-            cli_task_obj = asyncio.create_task(cli_task())
-            tasks.append(cli_task_obj)
-        else:
-            logger.info("🚀 Production mode: CLI disabled, running as web service")
-            # In production, just keep running forever
-            await asyncio.Future()  # Run forever
-
-        # If we have tasks (local development), wait for them
-        if tasks:
-            _, pending = await asyncio.wait(
-                tasks,
-                return_when=asyncio.FIRST_COMPLETED
-            )
-
-            # Cancel remaining tasks
-            for task in pending:
-                task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
+        try:
+            async with asyncio.TaskGroup() as tg:
+                # Only start standalone WebSocket server if enabled (for local development)
+                if ENABLE_STANDALONE_WEBSOCKET and not IS_PRODUCTION:
+                    logger.info(f"🔌 Starting standalone WebSocket server on port {WEBSOCKET_PORT}")
+                    tg.create_task(_stop_when_done(start_websocket_server()))
+                else:
+                    if IS_PRODUCTION:
+                        logger.info("🌐 Production mode: Using Flask-Sock for WebSocket (port 8765 disabled)")
+                        logger.info(f"📡 WebSocket available at: wss://your-domain/ws")
+                    else:
+                        logger.info("💡 Standalone WebSocket disabled. Using Flask-Sock only.")
+                        logger.info(f"📡 WebSocket available at: ws://{FLASK_HOST}:{FLASK_PORT}/ws")
+
+                # Start CLI task (only if not in production)
+                if not IS_PRODUCTION:
+                    tg.create_task(_stop_when_done(cli_task()))
+                else:
+                    logger.info("🚀 Production mode: CLI disabled, running as web service")
+                    # In production, just keep running forever
+                    await asyncio.Future()  # Run forever
+        except* _Shutdown:
+            # One task finished (e.g. CLI "exit"); the group has already cancelled the rest
+            pass
 
         logger.info("✅ Bot shutdown complete")
 
@@ -1852,7 +2199,10 @@ async def main():
 if __name__ == "__main__":
     logger.info("🕓 Bot starting ...")
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("\n👋 Goodbye!")
     except Exception as e:
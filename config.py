@@ -6,25 +6,38 @@ Handles secure storage and retrieval of user configuration settings
 import json
 import os
 import base64
-from cryptography.fernet import Fernet
+import threading
+from functools import lru_cache
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 import logging
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib json module
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # Get data directory from environment variable or use current directory
 DATA_DIR = os.getenv("DATA_DIR", ".")
 
 # Ensure data directory exists
-if not os.path.exists(DATA_DIR):
-    try:
-        os.makedirs(DATA_DIR, exist_ok=True)
-        logger.info(f"📁 Created data directory: {DATA_DIR}")
-    except Exception as e:
-        logger.warning(f"⚠️ Could not create data directory {DATA_DIR}: {e}")
-        logger.warning("⚠️ Using current directory for data storage")
-        DATA_DIR = "."
+try:
+    os.makedirs(DATA_DIR)
+    logger.info("📁 Created data directory: %s", DATA_DIR)
+except FileExistsError:
+    pass
+except Exception as e:
+    logger.warning("⚠️ Could not create data directory %s: %s", DATA_DIR, e)
+    logger.warning("⚠️ Using current directory for data storage")
+    DATA_DIR = "."
 
 CONFIG_FILE = os.path.join(DATA_DIR, "bot_config.json")
+# Indent bot_config.json for reading by hand; compact by default (stdlib json only indents on its slow path)
+CONFIG_PRETTY = os.getenv("CONFIG_PRETTY", "false").lower() == "true"
 KEY_FILE = os.path.join(DATA_DIR, ".config_key")
 
 # Warn if using /tmp (data will be lost on restart)
@@ -32,6 +45,63 @@ if DATA_DIR == "/tmp":
     logger.warning("⚠️ Using /tmp for data storage - data will be lost on restart!")
     logger.warning("⚠️ For persistent storage, upgrade to a paid Render plan with disk storage")
 
+@lru_cache(maxsize=1)
+def _load_key() -> bytes:
+    """Load (or create) the config encryption key once per process"""
+    # First, try to get key from environment variable (production)
+    env_key = os.getenv("ENCRYPTION_KEY")
+    if env_key:
+        try:
+            key = env_key.encode()
+            Fernet(key)  # Validates the key format
+            logger.info("🔐 Using encryption key from environment variable")
+            return key
+        except Exception as e:
+            logger.warning("⚠️  Invalid ENCRYPTION_KEY in environment: %s", e)
+
+    # Fall back to file-based key (development)
+    try:
+        # Load existing key
+        with open(KEY_FILE, 'rb') as f:
+            key = f.read()
+        logger.info("🔐 Using encryption key from file")
+    except FileNotFoundError:
+        # Generate new key; O_EXCL so a concurrent first start can't overwrite it, 0600 so it's never world-readable
+        key = Fernet.generate_key()
+        try:
+            fd = os.open(KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_CLOEXEC | os.O_NOFOLLOW, 0o600)
+        except FileExistsError:
+            # Another process created it in the meantime; use its key
+            with open(KEY_FILE, 'rb') as f:
+                key = f.read()
+            logger.info("🔐 Using encryption key from file")
+        else:
+            try:
+                os.write(fd, key)
+            finally:
+                os.close(fd)
+            logger.info("🔐 Generated new encryption key and saved to file")
+
+    return key
+
+@lru_cache(maxsize=1)
+def _get_cipher() -> Fernet:
+    """Fernet cipher, kept to read passwords stored by older versions"""
+    return Fernet(_load_key())
+
+@lru_cache(maxsize=1)
+def _get_aead() -> AESGCM:
+    """AES-256-GCM cipher for stored passwords, with its own key derived from the config key"""
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"bot-config-password")
+    return AESGCM(hkdf.derive(base64.urlsafe_b64decode(_load_key())))
+
+# Stored password tokens written with AES-GCM; anything else is a legacy Fernet token
+GCM_TOKEN_PREFIX = "gcm:"
+GCM_NONCE_SIZE = 12
+
+# Fields update_config accepts from the settings API
+CONFIG_FIELDS = frozenset({'email', 'password', 'default_url', 'slot_monitoring_time', 'monitoring_interval'})
+
 class ConfigManager:
     """Manages bot configuration with secure password storage"""
     
@@ -39,105 +109,156 @@ class ConfigManager:
         self.config_file = CONFIG_FILE
         self.key_file = KEY_FILE
         self.cipher = None
+        self.aead = None
+        self._cache = None  # Last successfully parsed config (password decrypted)
+        self._cache_mtime = None  # st_mtime_ns of the file _cache was parsed from
+        self._masked_view = None  # _cache with the password masked, for get_config_for_api
+        self._password_token = None  # (password, token) from the last encrypt, reused while the password is unchanged
         self._initialize_encryption()
         
     def _initialize_encryption(self):
         """Initialize encryption key for password storage"""
-        # First, try to get key from environment variable (production)
-        env_key = os.getenv("ENCRYPTION_KEY")
-        if env_key:
-            try:
-                key = env_key.encode()
-                self.cipher = Fernet(key)
-                logger.info("🔐 Using encryption key from environment variable")
-                return
-            except Exception as e:
-                logger.warning(f"⚠️  Invalid ENCRYPTION_KEY in environment: {e}")
-
-        # Fall back to file-based key (development)
-        if os.path.exists(self.key_file):
-            # Load existing key
-            with open(self.key_file, 'rb') as f:
-                key = f.read()
-            logger.info("🔐 Using encryption key from file")
-        else:
-            # Generate new key
-            key = Fernet.generate_key()
-            with open(self.key_file, 'wb') as f:
-                f.write(key)
-            logger.info("🔐 Generated new encryption key and saved to file")
-
-        self.cipher = Fernet(key)
+        self.cipher = _get_cipher()
+        self.aead = _get_aead()
     
     def _encrypt_password(self, password: str) -> str:
         """Encrypt password for secure storage"""
         if not password:
             return ""
-        encrypted = self.cipher.encrypt(password.encode())
-        return base64.b64encode(encrypted).decode()
+        nonce = os.urandom(GCM_NONCE_SIZE)
+        sealed = self.aead.encrypt(nonce, password.encode(), None)
+        return GCM_TOKEN_PREFIX + base64.urlsafe_b64encode(nonce + sealed).decode('ascii')
     
     def _decrypt_password(self, encrypted_password: str) -> str:
         """Decrypt password from storage"""
         if not encrypted_password:
             return ""
         try:
-            encrypted_bytes = base64.b64decode(encrypted_password.encode())
-            decrypted = self.cipher.decrypt(encrypted_bytes)
+            if encrypted_password.startswith(GCM_TOKEN_PREFIX):
+                blob = base64.urlsafe_b64decode(encrypted_password[len(GCM_TOKEN_PREFIX):])
+                decrypted = self.aead.decrypt(blob[:GCM_NONCE_SIZE], blob[GCM_NONCE_SIZE:], None)
+                return decrypted.decode()
+
+            # Fernet token from an older version; rewritten as AES-GCM on the next save
+            token = encrypted_password.encode('ascii')
+            try:
+                decrypted = self.cipher.decrypt(token)
+            except InvalidToken:
+                # Even older configs wrapped the token in a second layer of base64
+                decrypted = self.cipher.decrypt(base64.b64decode(token))
             return decrypted.decode()
         except Exception as e:
-            logger.error(f"❌ Failed to decrypt password: {e}")
+            logger.error("❌ Failed to decrypt password: %s", e)
             return ""
     
-    def load_config(self) -> dict:
-        """Load configuration from file"""
-        if not os.path.exists(self.config_file):
+    def _encrypt_cached(self, password: str) -> str:
+        """Encrypt password, reusing the previous token when only other fields changed"""
+        if self._password_token is not None and self._password_token[0] == password:
+            return self._password_token[1]
+        token = self._encrypt_password(password)
+        self._password_token = (password, token)
+        return token
+    
+    def _set_cache(self, config: dict, mtime: int):
+        """Remember a parsed config along with the masked copy served to the API"""
+        self._cache = config
+        self._cache_mtime = mtime
+        self._masked_view = self._mask_password(config)
+    
+    @staticmethod
+    def _mask_password(config: dict) -> dict:
+        """Copy of config with the password masked for security"""
+        masked = config.copy()
+        if masked.get('password'):
+            masked['password'] = '********'
+        return masked
+    
+    def _current_config(self) -> dict:
+        """Cached config, re-read only when the file changes (shared, callers must not mutate it)"""
+        try:
+            mtime = os.stat(self.config_file).st_mtime_ns
+        except FileNotFoundError:
             logger.info("ℹ️ No configuration file found, using defaults")
+            self._cache = self._cache_mtime = None
             return self._get_default_config()
-        
+
+        if self._cache is not None and mtime == self._cache_mtime:
+            return self._cache
+
         try:
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
+            with open(self.config_file, 'rb') as f:
+                raw = f.read()
+            config = orjson.loads(raw) if orjson is not None else json.loads(raw)
             
             # Decrypt password if present
             if config.get('password_encrypted'):
                 config['password'] = self._decrypt_password(config['password_encrypted'])
                 del config['password_encrypted']
             
+            # Only cache a successful parse so a broken file is retried on the next call
+            self._set_cache(config, mtime)
             logger.info("✅ Configuration loaded successfully")
             return config
         except Exception as e:
-            logger.error(f"❌ Failed to load configuration: {e}")
+            logger.error("❌ Failed to load configuration: %s", e)
+            if self._cache is not None:
+                logger.warning("⚠️ Keeping previously loaded configuration")
+                return self._cache
             return self._get_default_config()
     
-    def save_config(self, config: dict) -> bool:
-        """Save configuration to file"""
+    def load_config(self) -> dict:
+        """Load configuration from file, reusing the parsed result until the file changes"""
+        return self._current_config().copy()
+    
+    def save_config(self, config: dict, _owned: bool = False) -> bool:
+        """Save configuration to file
+
+        _owned means the caller hands config over (update_config does), so it is used without copying.
+        """
         try:
-            # Create a copy to avoid modifying original
-            config_to_save = config.copy()
+            # Copy unless the dict is ours, to avoid modifying the caller's original
+            config_to_save = config if _owned else config.copy()
             
-            # Encrypt password before saving
-            if config_to_save.get('password'):
-                config_to_save['password_encrypted'] = self._encrypt_password(config_to_save['password'])
-                del config_to_save['password']
+            # Swap the password for its encrypted token just for the dump, then put it back
+            password = config_to_save.get('password')
+            try:
+                if password:
+                    config_to_save['password_encrypted'] = self._encrypt_cached(password)
+                    del config_to_save['password']
+                if orjson is not None:
+                    payload = orjson.dumps(config_to_save, option=orjson.OPT_INDENT_2 if CONFIG_PRETTY else None)
+                elif CONFIG_PRETTY:
+                    payload = json.dumps(config_to_save, indent=2).encode()
+                else:
+                    payload = json.dumps(config_to_save, separators=(',', ':')).encode()
+            finally:
+                if password:
+                    config_to_save.pop('password_encrypted', None)
+                    config_to_save['password'] = password
             
-            with open(self.config_file, 'w') as f:
-                json.dump(config_to_save, f, indent=2)
+            # Write a temp file and swap it in so a crash never leaves a truncated config
+            tmp_file = self.config_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.config_file)
+            # Seed the cache with what we just wrote so the next load skips the re-read and decrypt
+            self._set_cache(config_to_save, os.stat(self.config_file).st_mtime_ns)
             
             logger.info("✅ Configuration saved successfully")
             return True
         except Exception as e:
-            logger.error(f"❌ Failed to save configuration: {e}")
+            logger.error("❌ Failed to save configuration: %s", e)
             return False
     
     def get_config_for_api(self) -> dict:
         """Get configuration for API response (password masked)"""
-        config = self.load_config()
-        
-        # Mask password for security
-        if config.get('password'):
-            config['password'] = '********'
-        
-        return config
+        config = self._current_config()
+        if config is self._cache:
+            # Masked once when the config was loaded or saved
+            return self._masked_view.copy()
+        return self._mask_password(config)
     
     def _get_default_config(self) -> dict:
         """Get default configuration"""
@@ -154,23 +275,34 @@ class ConfigManager:
         config = self.load_config()
         
         # Update only provided fields
-        for key in ['email', 'password', 'default_url', 'slot_monitoring_time', 'monitoring_interval']:
-            if key in updates:
-                config[key] = updates[key]
+        config.update((key, value) for key, value in updates.items() if key in CONFIG_FIELDS)
         
-        return self.save_config(config)
+        return self.save_config(config, _owned=True)
     
     def clear_config(self) -> bool:
         """Clear all configuration"""
         try:
-            if os.path.exists(self.config_file):
+            try:
                 os.remove(self.config_file)
+            except FileNotFoundError:
+                pass
+            self._cache = self._cache_mtime = None
             logger.info("🗑️ Configuration cleared")
             return True
         except Exception as e:
-            logger.error(f"❌ Failed to clear configuration: {e}")
+            logger.error("❌ Failed to clear configuration: %s", e)
             return False
 
-# Global instance
-config_manager = ConfigManager()
+# Shared instance, created on first use so importing this module stays cheap
+_config_manager = None
+_config_manager_lock = threading.Lock()
+
+def get_config_manager() -> ConfigManager:
+    """Return the shared ConfigManager, creating it (and loading the key) on first use"""
+    global _config_manager
+    if _config_manager is None:
+        with _config_manager_lock:
+            if _config_manager is None:
+                _config_manager = ConfigManager()
+    return _config_manager
 
@@ -194,6 +194,23 @@ function handleServerMessage(data) {
       }
       break;
 
+    case "booking_event_log_batch":
+      // Several event-specific log messages in one frame
+      if (data.booking_id && Array.isArray(data.entries)) {
+        // Don't save logs to server - backend already saved them
+        data.entries.forEach((entry) => {
+          addBookingLog(data.booking_id, entry.message, entry.level || "info", false);
+        });
+      }
+      break;
+
+    case "batch":
+      // Several server messages coalesced into one frame
+      if (Array.isArray(data.messages)) {
+        data.messages.forEach(handleServerMessage);
+      }
+      break;
+
     case "log":
       addLog(data.message, data.level || "info");
       break;
@@ -8,6 +8,21 @@ import json
 
 WS_URL = "ws://localhost:8765"
 
+# Fixed payloads encoded once; kept as str so they go out as text frames (bytes would be binary/MessagePack)
+PAYLOADS = {
+    "ack": json.dumps({
+        "type": "ack",
+        "status": "stored",
+        "url": "https://test.com"
+    }),
+    "result": json.dumps({
+        "type": "result",
+        "status": "success",
+        "tabId": 999,
+        "url": "https://test.com"
+    }),
+}
+
 async def test_connection():
     """Test WebSocket connection and message exchange"""
     print("🧪 Testing WebSocket Connection...")
@@ -16,12 +31,13 @@ async def test_connection():
     try:
         async with websockets.connect(WS_URL) as websocket:
             print("✅ Connected successfully!")
+            loop = asyncio.get_running_loop()
             
             # Test 1: Send hello message
             print("\n📤 Test 1: Sending 'hello' message...")
             await websocket.send(json.dumps({
                 "type": "hello",
-                "timestamp": asyncio.get_event_loop().time()
+                "timestamp": loop.time()
             }))
             
             # Wait for response
@@ -36,7 +52,7 @@ async def test_connection():
             print("\n📤 Test 2: Sending 'ping' message...")
             await websocket.send(json.dumps({
                 "type": "ping",
-                "timestamp": asyncio.get_event_loop().time()
+                "timestamp": loop.time()
             }))
             
             try:
@@ -49,24 +65,15 @@ async def test_connection():
             except asyncio.TimeoutError:
                 print("❌ No pong received")
             
-            # Test 3: Simulate extension acknowledgment
+            # Tests 3 and 4: Simulate extension acknowledgment and result
+            # Neither expects a reply, so both go out back to back
             print("\n📤 Test 3: Sending 'ack' message (simulating extension)...")
-            await websocket.send(json.dumps({
-                "type": "ack",
-                "status": "stored",
-                "url": "https://test.com"
-            }))
-            print("✅ Ack sent (check bot console for confirmation)")
-            
-            # Test 4: Simulate extension result
-            print("\n📤 Test 4: Sending 'result' message (simulating extension)...")
-            await websocket.send(json.dumps({
-                "type": "result",
-                "status": "success",
-                "tabId": 999,
-                "url": "https://test.com"
-            }))
-            print("✅ Result sent (check bot console for confirmation)")
+            print("📤 Test 4: Sending 'result' message (simulating extension)...")
+            await asyncio.gather(
+                websocket.send(PAYLOADS["ack"]),
+                websocket.send(PAYLOADS["result"])
+            )
+            print("✅ Ack and result sent (check bot console for confirmation)")
             
             print("\n✅ All tests completed!")
             print("\nℹ️ Check the bot console to verify it received and processed the messages.")